@@ -0,0 +1,49 @@
+"""
+Runs a :class:`FakeKxsServer` in its own process, so the benchmarked code has
+the cpu to itself.
+"""
+import asyncio
+import multiprocessing
+import typing as t
+from kxspy.fakeserver import FakeKxsServer
+
+
+def _serve(conn, kwargs: dict):
+    async def main():
+        server = FakeKxsServer(**kwargs)
+        await server.start()
+        conn.send(server.port)
+        await asyncio.get_running_loop().run_in_executor(None, conn.recv)
+        await server.close()
+
+    asyncio.run(main())
+
+
+class ServerProcess:
+    """
+    Context manager starting the server, ``ws_url`` and ``rest_url`` point to it.
+
+    Example:
+        with ServerProcess() as server:
+            client = kxspy.Client(ws_url=server.ws_url)
+    """
+    def __init__(self, **kwargs) -> None:
+        self.kwargs = kwargs
+        self.ws_url: t.Optional[str] = None
+        self.rest_url: t.Optional[str] = None
+        self._conn = None
+        self._process: t.Optional[multiprocessing.Process] = None
+
+    def __enter__(self) -> "ServerProcess":
+        self._conn, child_conn = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=_serve, args=(child_conn, self.kwargs), daemon=True)
+        self._process.start()
+        port = self._conn.recv()
+        self.ws_url, self.rest_url = f"ws://127.0.0.1:{port}/", f"http://127.0.0.1:{port}"
+        return self
+
+    def __exit__(self, *exc):
+        self._conn.send("stop")
+        self._process.join(10)
+        if self._process.is_alive():
+            self._process.terminate()
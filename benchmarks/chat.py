@@ -0,0 +1,99 @@
+"""
+Insert and search speed of :class:`kxspy.chat.ChatHistory` over 1M messages,
+compared to a linear scan of a list.
+
+Example:
+    python benchmarks/chat.py --messages 1000000
+"""
+import sys
+import json
+import random
+import argparse
+import tracemalloc
+import typing as t
+from time import perf_counter
+from kxspy.chat import ChatHistory, tokenize
+from kxspy.events import ChatMessage
+
+WORDS = [f"word{i}" for i in range(5000)]
+
+
+def _messages(count: int, users: int) -> t.List[ChatMessage]:
+    rng = random.Random(0)
+    # zipf-like word frequencies, like real chat
+    weights = [1 / (rank + 1) for rank in range(len(WORDS))]
+    messages = []
+    for i in range(count):
+        words = rng.choices(WORDS, weights, k=rng.randint(2, 10))
+        messages.append(ChatMessage(user=f"user{rng.randrange(users)}", text=" ".join(words), timestamp=i, system=False))
+    return messages
+
+
+def _timed(func: t.Callable, repeat: int) -> float:
+    start = perf_counter()
+    for _ in range(repeat):
+        func()
+    return (perf_counter() - start) / repeat * 1000
+
+
+def bench(count: int, users: int) -> dict:
+    messages = _messages(count, users)
+
+    history = ChatHistory(capacity=count)
+    start = perf_counter()
+    for message in messages:
+        history.add(message)
+    insert = perf_counter() - start
+
+    # built again for the memory, tracemalloc slows the inserts down
+    tracemalloc.start()
+    traced = ChatHistory(capacity=count)
+    for message in messages:
+        traced.add(message)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del traced
+
+    def linear(query: str, user: t.Optional[str] = None, limit: int = 50):
+        tokens, found = tokenize(query), []
+        for message in reversed(messages):
+            if (user is None or message.user == user) and tokens <= tokenize(message.text):
+                found.append(message)
+                if len(found) >= limit:
+                    break
+        return found
+
+    queries = {
+        "common": ("word0", None),
+        "rare": ("word4999", None),
+        "two_words": ("word3 word40", None),
+        "user": ("", "user7"),
+        "user_and_word": ("word100", "user7"),
+    }
+    searches = {}
+    for name, (query, user) in queries.items():
+        searches[name] = {
+            "results": history.count(query, user),
+            "index_ms": _timed(lambda: history.search(query, user=user), 20),
+            "linear_ms": _timed(lambda: linear(query, user), 1),
+        }
+
+    return {
+        "messages": count,
+        "insert_messages_s": count / insert,
+        "index_memory_mb": memory / 1e6,
+        "searches": searches,
+    }
+
+
+def main(argv: t.Optional[t.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="kxspy chat history benchmark.")
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    args = parser.parse_args(argv)
+    print(json.dumps(bench(args.messages, args.users), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""
+Sustained write rate and range scan speed of :class:`kxspy.journal.Journal`.
+
+Example:
+    python benchmarks/journal.py --events 500000
+"""
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import typing as t
+from time import perf_counter
+from kxspy.events import KillEvent, ChatMessage
+from kxspy.journal import Journal, JournalReader
+
+
+def bench(events: int, segment_size: int) -> dict:
+    path = tempfile.mkdtemp(prefix="kxspy-journal-")
+    try:
+        kill = KillEvent(killer="player_1", killed="player_2", timestamp=0)
+        chat = ChatMessage(user="player_1", text="gg well played", timestamp=0, system=False)
+        base = 1_700_000_000.0
+
+        start = perf_counter()
+        with Journal(path, max_segment_size=segment_size) as journal:
+            for i in range(events):
+                journal.write(chat if i % 4 == 0 else kill, timestamp=base + i / 1000)
+        write_time = perf_counter() - start
+
+        reader = JournalReader(path)
+        start = perf_counter()
+        scanned = sum(1 for _ in reader.scan())
+        full_scan_time = perf_counter() - start
+
+        # the last 1% of the journal, mostly skipped through the index
+        start = perf_counter()
+        ranged = sum(1 for _ in reader.scan(start=base + events * 0.99 / 1000))
+        range_time = perf_counter() - start
+
+        return {
+            "events": events,
+            "segments": len(reader.segments),
+            "write_events_s": events / write_time,
+            "scan_events_s": scanned / full_scan_time,
+            "range_events": ranged,
+            "range_scan_ms": range_time * 1000,
+        }
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def main(argv: t.Optional[t.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="kxspy journal benchmark.")
+    parser.add_argument("--events", type=int, default=500_000)
+    parser.add_argument("--segment-size", type=int, default=16 * 1024 * 1024)
+    args = parser.parse_args(argv)
+    print(json.dumps(bench(args.events, args.segment_size), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
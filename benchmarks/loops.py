@@ -0,0 +1,44 @@
+"""
+Frame throughput under the default asyncio loop and under uvloop, using
+:func:`kxspy.loadtest.loadtest` against the local stand-in server.
+
+Example:
+    python benchmarks/loops.py --clients 200 --rate 20 --duration 10
+"""
+import sys
+import json
+import argparse
+import logging
+import typing as t
+from kxspy.loadtest import loadtest
+from kxspy.utils import run, uvloop_available
+
+
+def main(argv: t.Optional[t.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="kxspy asyncio vs uvloop benchmark.")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=20.0, help="Chat messages per second per client.")
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    results = []
+    for use_uvloop in (False, True):
+        if use_uvloop and not uvloop_available():
+            print("uvloop is not installed, skipping it", file=sys.stderr)
+            continue
+        report = run(loadtest(clients=args.clients, rate=args.rate, duration=args.duration), use_uvloop=use_uvloop)
+        results.append({
+            "loop": report["loop"],
+            "throughput_msg_s": report["throughput_msg_s"],
+            "received_events": report["received_events"],
+            "latency_ms_p50": report["latency_ms"]["p50"],
+            "latency_ms_p99": report["latency_ms"]["p99"],
+            "cpu_percent": report["cpu_percent"],
+        })
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+Event throughput of :class:`kxspy.shard.ShardedClient` from 1 to N worker processes.
+
+A local :class:`FakeKxsServer` runs in its own process; every round it broadcasts
+a frame to all connections and the benchmark waits until the parent emitter has
+received every copy.
+
+Example:
+    python benchmarks/shard.py --connections 200 --max-shards 4 --rounds 200
+"""
+import os
+import sys
+import json
+import asyncio
+import argparse
+import typing as t
+from time import perf_counter
+import aiohttp
+from kxspy.events import IdentifyEvent, BroadCasteEvent
+from kxspy.shard import ShardedClient
+from _server import ServerProcess
+
+
+async def _run(url: str, rest_url: str, connections: int, shards: int, rounds: int, msg: str) -> dict:
+    identities = [{"ws_url": url, "username": f"bench_{i}"} for i in range(connections)]
+    sharded = ShardedClient(identities, shards=shards)
+    identified, received = set(), 0
+    ready, done = asyncio.Event(), asyncio.Event()
+
+    async def on_identify(event: IdentifyEvent):
+        identified.add(event.identity)
+        if len(identified) == connections:
+            ready.set()
+
+    async def on_broadcast(event: BroadCasteEvent):
+        nonlocal received
+        received += 1
+        if received == connections * rounds:
+            done.set()
+
+    sharded.emitter.add_listener(IdentifyEvent, on_identify)
+    sharded.emitter.add_listener(BroadCasteEvent, on_broadcast)
+    await sharded.start()
+    try:
+        await asyncio.wait_for(ready.wait(), 60)
+        async with aiohttp.ClientSession() as session:
+            start = perf_counter()
+            for _ in range(rounds):
+                async with session.post(f"{rest_url}/broadcast", json={"msg": msg}) as response:
+                    await response.read()
+            await asyncio.wait_for(done.wait(), 120)
+            elapsed = perf_counter() - start
+    finally:
+        await sharded.close()
+    return {
+        "shards": shards,
+        "events": received,
+        "seconds": elapsed,
+        "events_s": received / elapsed,
+    }
+
+
+def main(argv: t.Optional[t.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="kxspy sharding benchmark.")
+    parser.add_argument("--connections", type=int, default=200)
+    parser.add_argument("--max-shards", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--msg-size", type=int, default=512)
+    args = parser.parse_args(argv)
+
+    msg = "x" * args.msg_size
+    results = []
+    with ServerProcess() as server:
+        for shards in range(1, args.max_shards + 1):
+            results.append(asyncio.run(_run(server.ws_url, server.rest_url, args.connections, shards, args.rounds, msg)))
+    print(json.dumps({"cpu_count": os.cpu_count(), "connections": args.connections, "results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
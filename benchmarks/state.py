@@ -0,0 +1,95 @@
+"""
+Time-to-ready of a restarted :class:`kxspy.Client`, cold ( no saved session )
+vs warm ( ``state_store`` ).
+
+Ready means identified and back in the game: cold, the bot waits for its
+:class:`IdentifyEvent` and then joins; warm, the join is restored and sent right
+after the identify. The stand-in server runs in its own process and delays its
+frames by ``--latency`` seconds, as a distant node would.
+
+Example:
+    python benchmarks/state.py --restarts 50
+"""
+import os
+import sys
+import json
+import shutil
+import asyncio
+import argparse
+import tempfile
+import typing as t
+from time import perf_counter
+import kxspy
+from kxspy.events import IdentifyEvent, ConfirmGameStart
+from _server import ServerProcess
+
+GAME_ID = "bench_game"
+
+
+async def _start(url: str, state_store: t.Optional[str], join: bool) -> t.Tuple[kxspy.Client, float]:
+    start = perf_counter()
+    client = kxspy.Client(ws_url=url, username="bench", connect=False, state_store=state_store)
+    ready = asyncio.get_running_loop().create_future()
+
+    async def on_identify(event: IdentifyEvent):
+        if join:
+            await client.join_game(GAME_ID)
+
+    async def on_confirm(event: ConfirmGameStart):
+        if not ready.done():
+            ready.set_result(perf_counter() - start)
+
+    client.emitter.add_listener(IdentifyEvent, on_identify)
+    client.emitter.add_listener(ConfirmGameStart, on_confirm)
+    await client.connect()
+    return client, await asyncio.wait_for(ready, 10)
+
+
+async def _stop(client: kxspy.Client):
+    await client.close()
+    await client.ws.destroy()
+
+
+async def bench(url: str, restarts: int) -> dict:
+    path = tempfile.mkdtemp(prefix="kxspy-state-")
+    store = os.path.join(path, "state.db")
+    cold, warm = [], []
+    try:
+        for _ in range(restarts):
+            client, elapsed = await _start(url, None, join=True)
+            cold.append(elapsed)
+            await _stop(client)
+
+        # the first run saves the session the next ones resume
+        client, _ = await _start(url, store, join=True)
+        await _stop(client)
+        for _ in range(restarts):
+            client, elapsed = await _start(url, store, join=False)
+            warm.append(elapsed)
+            await _stop(client)
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+    median = lambda samples: sorted(samples)[len(samples) // 2] * 1000
+    return {
+        "restarts": restarts,
+        "cold_ms_p50": median(cold),
+        "warm_ms_p50": median(warm),
+        "cold_ms_max": max(cold) * 1000,
+        "warm_ms_max": max(warm) * 1000,
+    }
+
+
+def main(argv: t.Optional[t.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="kxspy warm restart benchmark.")
+    parser.add_argument("--restarts", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args(argv)
+    with ServerProcess(latency=args.latency) as server:
+        report = asyncio.run(bench(server.ws_url, args.restarts))
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
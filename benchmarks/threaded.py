@@ -0,0 +1,74 @@
+"""
+Cross-thread send latency of :class:`kxspy.threaded.ThreadedClient`.
+
+``send`` is the time from a call on the caller thread until its future reports
+the payload written by the loop thread; ``confirm`` is the time until a chat
+message is confirmed by the server ( ``chat_outbox=True`` ). The stand-in
+server runs in its own process.
+
+Example:
+    python benchmarks/threaded.py --sends 5000
+"""
+import sys
+import json
+import argparse
+import typing as t
+from time import perf_counter, sleep
+from kxspy.events import IdentifyEvent
+from kxspy.outbox import TokenBucket
+from kxspy.threaded import ThreadedClient
+from _server import ServerProcess
+
+
+def _percentiles(samples: t.List[float]) -> dict:
+    ordered = sorted(samples)
+    pick = lambda p: ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000
+    return {"p50_ms": pick(50), "p95_ms": pick(95), "p99_ms": pick(99), "max_ms": ordered[-1] * 1000}
+
+
+def _wait_identified(kxs: ThreadedClient, timeout: float = 30.0):
+    end = perf_counter() + timeout
+    while kxs.last(IdentifyEvent) is None:
+        if perf_counter() > end:
+            raise TimeoutError("The client was not identified in time.")
+        sleep(0.01)
+
+
+def bench(url: str, sends: int, messages: int) -> dict:
+    with ThreadedClient(ws_url=url, chat_outbox=True) as kxs:
+        _wait_identified(kxs)
+
+        send = []
+        for i in range(sends):
+            start = perf_counter()
+            kxs.report_kill("bench", f"player_{i}").result(timeout=10)
+            send.append(perf_counter() - start)
+
+        # measure the round trip, not the chat rate limit
+        kxs.client.outbox.bucket = TokenBucket(rate=100_000, burst=100_000)
+        confirm = []
+        for i in range(messages):
+            start = perf_counter()
+            kxs.send_message(f"message {i}").result(timeout=10)
+            confirm.append(perf_counter() - start)
+
+    return {
+        "send": _percentiles(send),
+        "sends_s": sends / sum(send),
+        "confirm": _percentiles(confirm),
+    }
+
+
+def main(argv: t.Optional[t.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="kxspy ThreadedClient latency benchmark.")
+    parser.add_argument("--sends", type=int, default=5000)
+    parser.add_argument("--messages", type=int, default=1000)
+    args = parser.parse_args(argv)
+    with ServerProcess() as server:
+        report = bench(server.ws_url, args.sends, args.messages)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
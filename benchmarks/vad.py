@@ -0,0 +1,67 @@
+"""
+Speed of :class:`kxspy.vad.VoiceActivityDetector` compared to real time.
+
+The input alternates one second of speech-like tone with one second of low
+noise, in 20 ms int16 frames.
+
+Example:
+    python benchmarks/vad.py --seconds 600
+"""
+import sys
+import json
+import argparse
+import typing as t
+from time import perf_counter
+import numpy as np
+from kxspy.vad import VoiceActivityDetector
+
+
+def _signal(seconds: int, sample_rate: int, frame_ms: int) -> np.ndarray:
+    samples = sample_rate * frame_ms // 1000
+    frames_per_second = 1000 // frame_ms
+    rng = np.random.default_rng(0)
+    times = np.arange(samples) / sample_rate
+    tone = (np.sin(2 * np.pi * 220 * times) * 8000).astype(np.int16)
+    frames = rng.normal(0, 30, (seconds * frames_per_second, samples)).astype(np.int16)
+    for second in range(0, seconds, 2):
+        frames[second * frames_per_second:(second + 1) * frames_per_second] += tone
+    return frames
+
+
+def bench(seconds: int, sample_rate: int, frame_ms: int) -> dict:
+    frames = _signal(seconds, sample_rate, frame_ms)
+
+    vad = VoiceActivityDetector()
+    start = perf_counter()
+    for frame in frames:
+        vad.process(frame)
+    per_frame = perf_counter() - start
+
+    batched = VoiceActivityDetector()
+    start = perf_counter()
+    batched.process_many(frames)
+    many = perf_counter() - start
+
+    return {
+        "audio_seconds": seconds,
+        "frames": len(frames),
+        "process_x_realtime": seconds / per_frame,
+        "process_us_per_frame": per_frame / len(frames) * 1e6,
+        "process_many_x_realtime": seconds / many,
+        "suppressed_ratio": vad.stats.suppressed_ratio,
+        "bytes_saved": vad.stats.bytes_saved,
+    }
+
+
+def main(argv: t.Optional[t.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="kxspy voice activity detection benchmark.")
+    parser.add_argument("--seconds", type=int, default=600)
+    parser.add_argument("--sample-rate", type=int, default=48000)
+    parser.add_argument("--frame-ms", type=int, default=20)
+    args = parser.parse_args(argv)
+    print(json.dumps(bench(args.seconds, args.sample_rate, args.frame_ms), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
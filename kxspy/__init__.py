@@ -11,27 +11,97 @@ __license__ = 'MIT'
 __copyright__ = 'Copyright 2025-present lavecat'
 __version__ = '1.0.5b'
 
-from .client import Client
 from .objects import *
 from .events import *
-from .rest import RestApi
-from typing import Type, Callable
+from typing import Type, Callable, Optional, TYPE_CHECKING
+import importlib
 
+if TYPE_CHECKING:
+    from .client import Client
+    from .rest import RestApi
+    from .threaded import ThreadedClient
+    from .utils import run
+
+# imported on first access ( PEP 562 ) so that `import kxspy` stays cheap,
+# aiohttp and numpy are only loaded when they are needed.
+_LAZY_ATTRS = {
+    "Client": ".client",
+    "RestApi": ".rest",
+    "ThreadedClient": ".threaded",
+    "run": ".utils",
+}
+_LAZY_MODULES = {
+    "chat", "client", "emitter", "exceptions", "exchange", "failover", "fakeserver",
+    "game", "journal", "loadtest", "outbox", "presence", "rest", "shard", "threaded",
+    "state", "tracing", "transport", "utils", "vad", "ws",
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRS:
+        value = getattr(importlib.import_module(_LAZY_ATTRS[name], __name__), name)
+    elif name in _LAZY_MODULES:
+        value = importlib.import_module(f".{name}", __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRS) | _LAZY_MODULES)
 
 
 # https://github.com/devoxin/Lavalink.py/blob/development/lavalink/__init__.py#L28-L60
-def listener(*events: Type[Event]):
+def listener(
+    *events: Type[Event],
+    max_concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+    drop_if_busy: bool = False,
+    replay: bool = False,
+):
     """
     Marks this function as an event listener for Kxspy.
 
+    Parameters
+    ---------
+    max_concurrency: :class:`int`
+        Maximum number of calls of this handler running at once.
+    timeout: :class:`float`
+        Seconds after which a call is cancelled.
+    drop_if_busy: :class:`bool`
+        Drop events instead of waiting when ``max_concurrency`` is reached.
+    replay: :class:`bool`
+        Receive the last value of sticky events when registered, see :meth:`Emitter.last`.
+
     Example:
         @listener()
         async def on_any_event(self, event): ...
 
         @listener(ExchangeGameEnd)
         async def on_game_end(self, event: ExchangeGameEnd): ...
+
+        @listener(ChatMessage, max_concurrency=4, timeout=2.0)
+        async def on_chat(self, event: ChatMessage): ...
+
+        @listener(HeartBeatEvent, replay=True)
+        async def on_heartbeat(self, event: HeartBeatEvent): ...
     """
     def wrapper(func: Callable):
         setattr(func, "_kxspy_events", events)
+        setattr(func, "_kxspy_options", {
+            "max_concurrency": max_concurrency,
+            "timeout": timeout,
+            "drop_if_busy": drop_if_busy,
+            "replay": replay,
+        })
         return func
-    return wrapper
\ No newline at end of file
+    return wrapper
+
+
+# `from kxspy import *` keeps exporting what the eager imports used to expose,
+# the lazy names are resolved by __getattr__
+__all__ = [
+    name for name in globals()
+    if not name.startswith("_") and name not in ("importlib", "TYPE_CHECKING")
+] + list(_LAZY_ATTRS) + ["client", "emitter", "rest", "utils", "ws"]
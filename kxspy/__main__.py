@@ -0,0 +1,137 @@
+"""
+Command line tool for the Kxs network REST API.
+
+Example:
+    python -m kxspy online-count
+    python -m kxspy ig-count <gameId>
+    python -m kxspy --admin-key KEY broadcast "Server restart in 5 minutes"
+    cat ips.txt | python -m kxspy --admin-key KEY blacklist --reason spam
+    python -m kxspy --admin-key KEY unblacklist -f ips.txt
+"""
+import os
+import sys
+import json
+import asyncio
+import argparse
+import typing as t
+
+ADMIN_KEY_ENV = "KXSPY_ADMIN_KEY"
+
+
+def _read_ips(args: argparse.Namespace) -> t.List[str]:
+    lines: t.List[str] = list(args.ips)
+    for path in args.file or ():
+        with open(path, encoding="utf-8") as f:
+            lines.extend(f)
+    if not lines and not sys.stdin.isatty():
+        lines.extend(sys.stdin)
+    ips = []
+    for line in lines:
+        ip = line.split("#", 1)[0].strip()
+        if ip:
+            ips.append(ip)
+    return ips
+
+
+def _output(record: dict):
+    sys.stdout.write(json.dumps(record) + "\n")
+    sys.stdout.flush()
+
+
+async def _batch(rest, args: argparse.Namespace) -> int:
+    ips = _read_ips(args)
+    if not ips:
+        print("No ip given ( arguments, -f FILE or stdin ).", file=sys.stderr)
+        return 2
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    failures = 0
+
+    async def run(ip: str):
+        nonlocal failures
+        async with semaphore:
+            try:
+                if args.command == "blacklist":
+                    res = await rest.blacklist(ip, args.reason)
+                else:
+                    res = await rest.unblacklist(ip)
+                _output({"ip": ip, "ok": True, "response": res})
+            except Exception as e:
+                failures += 1
+                _output({"ip": ip, "ok": False, "error": f"{type(e).__name__}: {e}"})
+
+    await asyncio.gather(*(run(ip) for ip in ips))
+    return 1 if failures else 0
+
+
+async def _main(args: argparse.Namespace) -> int:
+    import aiohttp
+    from .rest import RestApi
+    from .exceptions import RestError
+
+    # non 2xx responses ( bad admin key, unknown route ) are failures
+    async with RestApi(args.rest_url, args.admin_key, raise_for_status=True) as rest:
+        if args.command in ("blacklist", "unblacklist"):
+            return await _batch(rest, args)
+
+        try:
+            if args.command == "online-count":
+                res = await rest.online_count()
+            elif args.command == "ig-count":
+                res = await rest.ig_count(args.game_id)
+            elif args.command == "broadcast":
+                res = await rest.broadcast(args.msg)
+            elif args.command == "status":
+                res = await rest.user_manager_status()
+            elif args.command == "latest-version":
+                res = await rest.getLatestVersion()
+            else:
+                raise ValueError(args.command)
+        except (RestError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            _output({"command": args.command, "ok": False, "error": f"{type(e).__name__}: {e}"})
+            return 1
+        _output({"command": args.command, "ok": True, "response": res})
+        return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m kxspy", description="Kxs network REST API tool.")
+    parser.add_argument("--rest-url", default="https://network.kxs.rip", help="REST url of the Kxs network.")
+    parser.add_argument(
+        "--admin-key",
+        default=os.environ.get(ADMIN_KEY_ENV),
+        help=f"Admin key for admin routes ( defaults to ${ADMIN_KEY_ENV} ).",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("online-count", help="Number of online players.")
+    sub.add_parser("latest-version", help="Latest Kxs version.")
+    sub.add_parser("status", help="Users manager status ( admin ).")
+
+    ig = sub.add_parser("ig-count", help="Number of players in a game.")
+    ig.add_argument("game_id")
+
+    broadcast = sub.add_parser("broadcast", help="Broadcast a message ( admin ).")
+    broadcast.add_argument("msg")
+
+    for name in ("blacklist", "unblacklist"):
+        batch = sub.add_parser(name, help=f"{name.capitalize()} ips ( admin ), from arguments, files or stdin.")
+        batch.add_argument("ips", nargs="*")
+        batch.add_argument("-f", "--file", action="append", help="File with one ip per line.")
+        batch.add_argument("-c", "--concurrency", type=int, default=8, help="Requests in flight.")
+        if name == "blacklist":
+            batch.add_argument("-r", "--reason", default="", help="Blacklist reason.")
+
+    return parser
+
+
+def main(argv: t.Optional[t.List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
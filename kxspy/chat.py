@@ -0,0 +1,240 @@
+import re
+import sys
+import logging
+import typing as t
+from array import array
+from bisect import bisect_left
+from .events import ChatMessage
+
+_LOG = logging.getLogger("kxspy.chat")
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> t.Set[str]:
+    """Lowercase word tokens of ``text``, as indexed by :class:`ChatHistory`."""
+    return set(_TOKEN_RE.findall(text.lower())) if text else set()
+
+
+class _Postings:
+    # ascending message ids, ids before ``start`` were evicted
+    __slots__ = ("ids", "start")
+
+    def __init__(self) -> None:
+        self.ids: t.List[int] = []
+        self.start = 0
+
+    def __len__(self) -> int:
+        return len(self.ids) - self.start
+
+    def evict(self, message_id: int) -> bool:
+        """Drop ``message_id`` from the head, returns ``True`` once empty."""
+        if self.start < len(self.ids) and self.ids[self.start] == message_id:
+            self.start += 1
+            if self.start > 64 and self.start * 2 > len(self.ids):
+                del self.ids[:self.start]
+                self.start = 0
+        return self.start >= len(self.ids)
+
+    def __contains__(self, message_id: int) -> bool:
+        i = bisect_left(self.ids, message_id, self.start)
+        return i < len(self.ids) and self.ids[i] == message_id
+
+    def newest(self) -> t.Iterator[int]:
+        ids = self.ids
+        for i in range(len(ids) - 1, self.start - 1, -1):
+            yield ids[i]
+
+
+class ChatHistory:
+    """
+    Bounded history of :class:`ChatMessage` with keyword and user search.
+
+    Messages are stored column wise in a ring of ``capacity`` slots and get an
+    increasing id. An inverted index ( token -> message ids ) and a per-user index
+    are updated as messages arrive; when a message is overwritten its postings are
+    dropped from the head of each list. Searches intersect the posting lists, so
+    they cost the size of the rarest term rather than the size of the history.
+
+    Parameters
+    ---------
+    emitter: :class:`Emitter`
+        The emitter to record :class:`ChatMessage` from, ``None`` to only use :meth:`add`.
+    capacity: :class:`int`
+        Number of messages kept.
+
+    Example:
+        history = ChatHistory(client.emitter)
+        history.search("cheater", user="player1")
+    """
+    def __init__(self, emitter=None, capacity: int = 100_000) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be positive.")
+        self.capacity = capacity
+        self.emitter = emitter
+
+        self._users: t.List[t.Optional[str]] = [None] * capacity
+        self._texts: t.List[t.Optional[str]] = [None] * capacity
+        self._timestamps = array("q", bytes(8 * capacity))
+        self._system = bytearray(capacity)
+        # id of the next message, ids below ``_next - capacity`` were evicted
+        self._next = 0
+
+        self._tokens: t.Dict[str, _Postings] = {}
+        self._by_user: t.Dict[str, _Postings] = {}
+
+        self._attached = False
+        self.attach()
+
+    def attach(self):
+        """Record :class:`ChatMessage` from the emitter, again after :meth:`close`."""
+        if self.emitter is not None and not self._attached:
+            self.emitter.add_listener(ChatMessage, self._on_message)
+            self._attached = True
+
+    async def _on_message(self, event: ChatMessage):
+        self.add(event)
+
+    def __len__(self) -> int:
+        return min(self._next, self.capacity)
+
+    @property
+    def oldest_id(self) -> int:
+        """Id of the oldest message kept."""
+        return max(0, self._next - self.capacity)
+
+    def add(self, message: ChatMessage) -> int:
+        """
+        Store a message, evicting the oldest one when full.
+
+        Returns
+        -------
+        :class:`int`
+            The id of the message.
+        """
+        message_id = self._next
+        slot = message_id % self.capacity
+        if message_id >= self.capacity:
+            self._evict(message_id - self.capacity, slot)
+
+        user = sys.intern(message.user) if message.user else message.user
+        text = message.text or ""
+        self._users[slot] = user
+        self._texts[slot] = text
+        self._timestamps[slot] = message.timestamp or 0
+        self._system[slot] = bool(message.system)
+
+        for token in tokenize(text):
+            postings = self._tokens.get(token)
+            if postings is None:
+                postings = self._tokens[token] = _Postings()
+            postings.ids.append(message_id)
+        if user:
+            postings = self._by_user.get(user)
+            if postings is None:
+                postings = self._by_user[user] = _Postings()
+            postings.ids.append(message_id)
+
+        self._next += 1
+        return message_id
+
+    def _evict(self, message_id: int, slot: int):
+        for token in tokenize(self._texts[slot]):
+            postings = self._tokens.get(token)
+            if postings is not None and postings.evict(message_id):
+                del self._tokens[token]
+        user = self._users[slot]
+        if user:
+            postings = self._by_user.get(user)
+            if postings is not None and postings.evict(message_id):
+                del self._by_user[user]
+
+    def get(self, message_id: int) -> t.Optional[ChatMessage]:
+        """The message with ``message_id``, ``None`` if it was evicted."""
+        if not self.oldest_id <= message_id < self._next:
+            return None
+        slot = message_id % self.capacity
+        return ChatMessage(
+            user=self._users[slot],
+            text=self._texts[slot],
+            timestamp=self._timestamps[slot],
+            system=bool(self._system[slot]),
+        )
+
+    def recent(self, limit: int = 50) -> t.List[ChatMessage]:
+        """The last ``limit`` messages, newest first."""
+        stop = max(self.oldest_id, self._next - limit)
+        return [self.get(i) for i in range(self._next - 1, stop - 1, -1)]
+
+    def search_ids(self, query: str = "", user: t.Optional[str] = None, limit: t.Optional[int] = 50) -> t.List[int]:
+        """
+        Ids of the messages containing every word of ``query`` ( and sent by
+        ``user`` when given ), newest first.
+        """
+        lists: t.List[_Postings] = []
+        for token in tokenize(query):
+            postings = self._tokens.get(token)
+            if postings is None:
+                return []
+            lists.append(postings)
+        if user is not None:
+            postings = self._by_user.get(user)
+            if postings is None:
+                return []
+            lists.append(postings)
+        if not lists:
+            stop = self.oldest_id if limit is None else max(self.oldest_id, self._next - limit)
+            return list(range(self._next - 1, stop - 1, -1))
+
+        lists.sort(key=len)
+        rarest, others = lists[0], lists[1:]
+        found = []
+        for message_id in rarest.newest():
+            if all(message_id in postings for postings in others):
+                found.append(message_id)
+                if limit is not None and len(found) >= limit:
+                    break
+        return found
+
+    def search(self, query: str = "", user: t.Optional[str] = None, limit: t.Optional[int] = 50) -> t.List[ChatMessage]:
+        """
+        Messages containing every word of ``query`` ( and sent by ``user`` when
+        given ), newest first.
+
+        Parameters
+        ---------
+        query: :class:`str`
+            Words to look for, case insensitive.
+        user: :class:`str`
+            Only messages of this user.
+        limit: :class:`int`
+            Maximum number of results, ``None`` for all.
+        """
+        return [self.get(i) for i in self.search_ids(query, user, limit)]
+
+    def by_user(self, user: str, limit: t.Optional[int] = 50) -> t.List[ChatMessage]:
+        """Messages of ``user``, newest first."""
+        return self.search(user=user, limit=limit)
+
+    def count(self, query: str = "", user: t.Optional[str] = None) -> int:
+        """Number of messages matching ``query`` and ``user``."""
+        return len(self.search_ids(query, user, limit=None))
+
+    def clear(self):
+        """Forget every message."""
+        self._users = [None] * self.capacity
+        self._texts = [None] * self.capacity
+        self._timestamps = array("q", bytes(8 * self.capacity))
+        self._system = bytearray(self.capacity)
+        self._next = 0
+        self._tokens.clear()
+        self._by_user.clear()
+
+    def close(self):
+        """Stop recording messages from the emitter, the history is kept."""
+        if self.emitter is not None and self._attached:
+            try:
+                self.emitter.remove_listener(ChatMessage, self._on_message)
+            except ValueError:
+                pass
+            self._attached = False
@@ -1,93 +1,168 @@
 import logging
 import typing as t
-import numpy as np
 import aiohttp
 from .ws import WS
-from .events import Event
 from .utils import get_random_username
-from typing import Union, List, Optional
+from typing import Union, List, Optional, TYPE_CHECKING
 from .rest import RestApi
+from .presence import Presence
+from .outbox import ChatOutbox
+from .game import GameTracker
+from .transport import TransportConfig
+from .failover import EndpointPool
+from .vad import VoiceActivityDetector, SILENCE, COMFORT_NOISE
+from .events import Event
+from .chat import ChatHistory
+from .tracing import Tracer
+from .state import StateStore, SessionState, open_store
+
+if TYPE_CHECKING:
+    import numpy as np
 
 _LOG = logging.getLogger("kxspy.client")
 
 class Client:
     """
     The main class.
+
+    Local trackers are opt-in, their listeners make every matching event be built:
+    ``presence`` keeps the online players ( :meth:`is_online` ), ``track_games``
+    applies game events to :attr:`games`, which otherwise only follows
+    :meth:`join_game` and :meth:`leave_game`.
+
+    A ``state_store`` given as a path is shared by key: each explicit ``username``
+    gets its own snapshot, clients with a random username share ``"default"``.
     """
     def __init__(
         self,
         ws_url: str = "wss://network.kxs.rip/",
         rest_url: str = "https://network.kxs.rip",
-        username: str = get_random_username(),
+        username: t.Optional[str] = None,
         enablevoicechat: bool = False,
         exchangekey: str = None,
         isMobile: bool = False,
         isSecure: bool = True,
         admin_key: str = None,
         connect: bool = True,
-        session: t.Optional[aiohttp.ClientSession] = None
+        session: t.Optional[aiohttp.ClientSession] = None,
+        chat_outbox: t.Union[bool, ChatOutbox] = False,
+        ordered_exchange: bool = False,
+        transport: t.Optional[TransportConfig] = None,
+        endpoints: t.Optional[t.Union[EndpointPool, t.List[t.Tuple[str, str]]]] = None,
+        vad: t.Union[bool, VoiceActivityDetector] = False,
+        chat_history: t.Union[bool, ChatHistory] = False,
+        presence: t.Union[bool, Presence] = False,
+        track_games: bool = False,
+        tracer: t.Optional[Tracer] = None,
+        state_store: t.Optional[t.Union[str, StateStore]] = None
     ) -> None:
+        # identity fields given by the caller win over a restored session
+        identity_given = {"username": username is not None, "exchange_key": exchangekey is not None}
+        if username is None:
+            username = get_random_username()
         self.ws = WS(
             ws_url=ws_url,
             username=username,
             enable_voice_chat=enablevoicechat,
             exchange_key=exchangekey,
-            connect=connect,
+            # with endpoints the node is chosen by connect()
+            connect=connect and endpoints is None,
             isMobile=isMobile,
             isSecure=isSecure,
-            session=session
+            session=session,
+            ordered_exchange=ordered_exchange,
+            transport=transport,
+            tracer=tracer
         )
         self.username = username
         self.rest = RestApi(rest_url,admin_key,session)
         self.emitter = self.ws.emitter
-        self._registered_listeners: t.List[t.Tuple[t.Any, t.Callable, t.Type[Event]]] = []
+        if presence is True:
+            presence = Presence(self.emitter)
+        self.presence: t.Optional[Presence] = presence if isinstance(presence, Presence) else None
+        self.games = GameTracker(self.emitter if track_games else None)
+        if chat_outbox is True:
+            chat_outbox = ChatOutbox(self.ws)
+        self.outbox: t.Optional[ChatOutbox] = chat_outbox if isinstance(chat_outbox, ChatOutbox) else None
+        if endpoints is not None and not isinstance(endpoints, EndpointPool):
+            endpoints = EndpointPool(endpoints)
+        self.endpoints: t.Optional[EndpointPool] = endpoints
+        if vad is True:
+            vad = VoiceActivityDetector()
+        self.vad: t.Optional[VoiceActivityDetector] = vad if isinstance(vad, VoiceActivityDetector) else None
+        if chat_history is True:
+            chat_history = ChatHistory(self.emitter)
+        # not truthiness, an empty ChatHistory is falsy
+        self.chat_history: t.Optional[ChatHistory] = chat_history if isinstance(chat_history, ChatHistory) else None
+
+        self.state: t.Optional[SessionState] = None
+        if state_store is not None:
+            if isinstance(state_store, str):
+                # one row per client in a shared database, a random username changes on every start
+                state_store = open_store(state_store, key=username if identity_given["username"] else "default")
+            self.state = SessionState(self, state_store)
+            # the connection task has not run yet, the restored queue is sent after identify
+            self.state.restore(
+                keep_username=identity_given["username"],
+                keep_exchange_key=identity_given["exchange_key"],
+            )
+            try:
+                self.state.start()
+            except RuntimeError:
+                _LOG.debug("No running event loop, session snapshots start on connect().")
+        if self.endpoints is not None and connect:
+            _LOG.debug("Endpoints are probed on connect(), not connecting from the constructor.")
 
 
-    def add_event_hooks(self, obj):
+    def add_event_hooks(self, obj: t.Any, weak: bool = False):
         """
         Scans the provided class ``obj`` for functions decorated with :func:`listener`,
-        and sets them up to process Lavalink events.
+        and sets them up to process Kxs events.
+
+        With ``weak=True`` the methods are only weakly referenced, see :meth:`Emitter.add_event_hooks`.
         """
-        for attr_name in dir(obj):
-            method = getattr(obj, attr_name)
-            events = getattr(method, "_kxspy_events", None)
-            if not events:
-                continue
-
-            if not events:
-                self.emitter.add_listener(event=None, func=method)
-            else:
-                for ev in events:
-                    self.emitter.add_listener(event=ev, func=method)
+        self.emitter.add_event_hooks(obj, weak=weak)
 
     def remove_event_hooks(self, obj: t.Any):
         """
         Removes all previously registered listeners for an object.
         """
-        to_remove = [r for r in self._registered_listeners if r[0] == obj]
-        for _, method, ev in to_remove:
-            try:
-                self.emitter.remove_listener(event=ev, func=method)
-                _LOG.debug(f"Removed listener: {method.__name__} for {ev}")
-            except Exception as e:
-                _LOG.warning(f"Failed to remove listener {method.__name__}: {e}")
-
-            self._registered_listeners.remove((_, method, ev))
+        self.emitter.remove_event_hooks(obj)
 
     async def connect(self):
-        """Connect to Kxs Network."""
+        """Connect to Kxs Network, to the fastest of ``endpoints`` when given."""
+        if self.endpoints is not None:
+            await self.endpoints.attach(self)
+        if self.state is not None:
+            self.state.start()
+        if self.chat_history is not None:
+            # detached by close()
+            self.chat_history.attach()
         await self.ws.connect()
 
     async def close(self):
         """Close connection to Kxs Network."""
+        if self.state is not None:
+            await self.state.close()
+        if self.outbox is not None:
+            await self.outbox.close()
+        if self.endpoints is not None:
+            await self.endpoints.close()
+        if self.chat_history is not None:
+            self.chat_history.close()
+        await self.rest.close()
+        if self.ws.exchange is not None:
+            await self.ws.exchange.close()
         await self.ws.close()
 
     async def join_game(self, gameId):
         """Join a game by its ID."""
+        self.games.join(gameId)
         await self.ws.send({"op": 3, "d": {"gameId": gameId,"user": self.username}})
 
     async def leave_game(self):
         """Leave the current game."""
+        self.games.leave()
         await self.ws.send({"op": 4, "d": {}})
 
     async def report_kill(self,killer: str, killed: str):
@@ -99,27 +174,83 @@ class Client:
         await self.ws.send({"op": 6, "d": {}})
 
     async def send_message(self,text: str):
-        """Send a message to the in-game chat"""
+        """Send a message to the in-game chat
+
+        With ``chat_outbox`` enabled the message is queued behind the rate limiter and
+        the returned future is resolved on :class:`ConfirmChatMessage`.
+        """
+        if self.outbox is not None:
+            return self.outbox.send(text)
         await self.ws.send({"op": 7, "d": {"text":text}})
 
     async def update_voicechat(self,isVoiceChat: bool):
         """Update the voice chat status"""
         await self.ws.send({"op": 98, "d": {"isVoiceChat":isVoiceChat}})
 
-    async def send_voicedata(self, audio_data: Union[bytes, bytearray,np.ndarray, List[int]], user_id: Optional[str] = None):
-        """Update the voice chat status"""
+    async def send_voicedata(self, audio_data: Union[bytes, bytearray, "np.ndarray", List[int]], user_id: Optional[str] = None) -> bool:
+        """
+        Send a voice frame.
+
+        With ``vad`` enabled, silent frames are dropped and the start of a silence
+        is sent as an empty frame, see :class:`VoiceActivityDetector`.
+
+        Returns
+        -------
+        :class:`bool`
+            ``False`` if the frame was suppressed.
+        """
+        import numpy as np
+
         if isinstance(audio_data, (bytes, bytearray)):
             int16_array = np.frombuffer(audio_data, dtype=np.int16)
-            data_to_send = int16_array.tolist()
         elif isinstance(audio_data, np.ndarray) and audio_data.dtype == np.int16:
-            data_to_send = audio_data.tolist()
+            int16_array = audio_data
         elif isinstance(audio_data, list):
-            data_to_send = audio_data
+            int16_array = None
         else:
             raise TypeError(
                 "audio_data must be bytes, bytearray, numpy.ndarray[int16], or list[int]"
             )
+
+        if self.vad is not None:
+            if int16_array is None:
+                int16_array = np.asarray(audio_data, dtype=np.int16)
+            decision = self.vad.process(int16_array)
+            if decision == SILENCE:
+                return False
+            if decision == COMFORT_NOISE:
+                await self.ws.send({"op": 99, "d": [], "u": user_id or self.ws.uuid})
+                return False
+
+        data_to_send = audio_data if int16_array is None else int16_array.tolist()
         await self.ws.send({"op": 99, "d": data_to_send, "u":user_id or self.ws.uuid})
+        return True
+
+    def _presence(self) -> Presence:
+        if self.presence is None:
+            raise RuntimeError("Presence tracking is disabled, create the Client with presence=True.")
+        return self.presence
+
+    def is_online(self, name: str) -> bool:
+        """Check if a player is online, from the local presence index"""
+        return self._presence().is_online(name)
+
+    @property
+    def online_count(self) -> int:
+        """Number of online players, from the local presence index"""
+        return self._presence().online_count
+
+    def last(self, event: t.Union[str, t.Type[Event]], default: t.Any = None) -> t.Any:
+        """
+        The last received event of a type, without waiting or polling.
+
+        Only sticky events are retained, by default :class:`HeartBeatEvent`,
+        :class:`IdentifyEvent` and :class:`VersionUpdate`, see :meth:`Emitter.set_sticky`.
+
+        Example:
+            heartbeat = client.last(HeartBeatEvent)
+        """
+        return self.emitter.last(event, default)
 
     async def ws_latency(self):
         """Send the latency of websocket"""
@@ -1,40 +1,236 @@
 import asyncio
 import typing as t
-from collections import deque
+import weakref
 import logging
+from collections import deque
+from functools import partial
+from inspect import getmro
+from time import perf_counter, perf_counter_ns
 from .events import Event
+from .tracing import FrameTrace, current_frame
 
 _LOG = logging.getLogger("kxspy.emitter")
 
+ANY_EVENT = "*"
+
+# events retained by default for :meth:`Emitter.last`, they describe the current state
+STICKY_EVENTS = ("HeartBeatEvent", "IdentifyEvent", "VersionUpdate")
+
 # |----------------------------------------------------------------------------|
 # | https://github.com/HazemMeqdad/lavaplay.py/blob/master/lavaplay/emitter.py |
 # |----------------------------------------------------------------------------|
 
+# decorated methods per class: [(attribute name, events, options)]
+_HOOKS_CACHE: "weakref.WeakKeyDictionary[type, t.List[t.Tuple[str, tuple, dict]]]" = weakref.WeakKeyDictionary()
+
+
+def _class_hooks(cls: type) -> t.List[t.Tuple[str, tuple, dict]]:
+    hooks = _HOOKS_CACHE.get(cls)
+    if hooks is None:
+        hooks, seen = [], set()
+        for klass in getmro(cls):
+            for name, attr in vars(klass).items():
+                if name in seen:
+                    continue
+                seen.add(name)
+                events = getattr(attr, "_kxspy_events", None)
+                if events is not None:
+                    hooks.append((name, events, getattr(attr, "_kxspy_options", {})))
+        _HOOKS_CACHE[cls] = hooks
+    return hooks
+
+
+def _event_name(event: t.Union[str, t.Type[Event], None]) -> str:
+    if event is None:
+        return ANY_EVENT
+    return event if isinstance(event, str) else event.__name__
+
+
+class HandlerStats:
+    """
+    Execution statistics of a handler for an event.
+    """
+    __slots__ = ("name", "event", "calls", "errors", "timeouts", "dropped", "durations")
+
+    def __init__(self, name: str, event: str, window: int = 1024) -> None:
+        self.name = name
+        self.event = event
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.dropped = 0
+        # durations of the last ``window`` calls, in seconds
+        self.durations: t.Deque[float] = deque(maxlen=window)
+
+    def percentile(self, p: float) -> float:
+        """Duration percentile ( ``0`` - ``100`` ) of the recent calls, in seconds."""
+        if not self.durations:
+            return 0.0
+        ordered = sorted(self.durations)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "event": self.event,
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "dropped": self.dropped,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": max(self.durations, default=0.0),
+        }
+
+
+class Listener:
+    """
+    A registered listener.
+
+    Bound methods added with ``weak=True`` are only weakly referenced, so their
+    owner can be garbage collected ( e.g. a reloaded cog ).
+    """
+    __slots__ = ("event", "_func", "_ref", "max_concurrency", "timeout", "drop_if_busy", "running", "_semaphore")
+
+    def __init__(
+        self,
+        event: str,
+        func: t.Callable,
+        weak: bool = False,
+        max_concurrency: t.Optional[int] = None,
+        timeout: t.Optional[float] = None,
+        drop_if_busy: bool = False,
+    ) -> None:
+        self.event = event
+        self._func = func
+        self._ref = None
+        if drop_if_busy and not max_concurrency:
+            max_concurrency = 1
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.drop_if_busy = drop_if_busy
+        self.running = 0
+        self._semaphore: t.Optional[asyncio.Semaphore] = None
+        if weak and hasattr(func, "__self__"):
+            try:
+                self._ref = weakref.WeakMethod(func)
+                self._func = None
+            except TypeError:
+                # owner does not support weak references
+                pass
+
+    @property
+    def func(self) -> t.Optional[t.Callable]:
+        """The callback, ``None`` if its owner was garbage collected."""
+        return self._func if self._ref is None else self._ref()
+
+    @property
+    def semaphore(self) -> t.Optional[asyncio.Semaphore]:
+        if self.max_concurrency and self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+
 class Emitter:
     """
     The class is a manger event from websocket.
+
+    Parameters
+    ---------
+    slow_handler_threshold: :class:`float`
+        Seconds after which a handler call is logged as slow, ``None`` to disable.
+    sticky: :class:`list`
+        Events whose last value is retained, see :meth:`last`.
     """
 
-    def __init__(self) -> None:
-        self._loop = asyncio.get_event_loop()
-        self.listeners = deque()
+    def __init__(
+        self,
+        slow_handler_threshold: t.Optional[float] = 1.0,
+        sticky: t.Iterable[t.Union[str, t.Type[Event]]] = STICKY_EVENTS,
+    ) -> None:
+        self.slow_handler_threshold = slow_handler_threshold
+        self.sticky: t.Set[str] = {_event_name(event) for event in sticky}
+        self._last: t.Dict[str, t.Any] = {}
+        self._tasks: t.Set[asyncio.Task] = set()
+        self._stats: t.Dict[t.Tuple[str, str], HandlerStats] = {}
+        # event name -> {id(listener): listener}, dicts keep insertion order
+        self.listeners: t.Dict[str, t.Dict[int, Listener]] = {}
+        # id(owner) -> (listeners added by add_event_hooks, gc finalizer)
+        self._owners: t.Dict[int, t.Tuple[t.List[Listener], t.Optional[weakref.finalize]]] = {}
 
-    def add_listener(self, event: t.Union[str, Event], func: t.Callable):
+    def add_listener(
+        self,
+        event: t.Union[str, Event, None],
+        func: t.Callable,
+        weak: bool = False,
+        max_concurrency: t.Optional[int] = None,
+        timeout: t.Optional[float] = None,
+        drop_if_busy: bool = False,
+        replay: bool = False,
+    ) -> Listener:
         """
         Add listener for listeners list.
 
         Parameters
         ---------
         event: :class:`str` | :class:`Any`
-            event name or class for event
+            event name or class for event, ``None`` for every event
         func: :class:`function`
             the function to callback event
+        weak: :class:`bool`
+            only keep a weak reference to a bound method
+        max_concurrency: :class:`int`
+            maximum number of calls running at once
+        timeout: :class:`float`
+            seconds after which a call is cancelled
+        drop_if_busy: :class:`bool`
+            drop events instead of waiting when ``max_concurrency`` is reached
+        replay: :class:`bool`
+            call ``func`` right away with the retained value of a sticky event, see :meth:`last`
+
+        Returns
+        -------
+        :class:`Listener`
+            The registered listener, usable with :meth:`remove`.
         """
         _LOG.debug(f"add listener {event}")
-        event = event if isinstance(event, str) else event.__name__
-        self.listeners.append({"event": event, "func": func})
+        event = _event_name(event)
+        listener = Listener(
+            event, func, weak=weak,
+            max_concurrency=max_concurrency, timeout=timeout, drop_if_busy=drop_if_busy,
+        )
+        self.listeners.setdefault(event, {})[id(listener)] = listener
+        if replay:
+            self._replay(listener)
+        return listener
+
+    def _replay(self, listener: Listener):
+        if listener.event == ANY_EVENT:
+            retained = list(self._last.items())
+        elif listener.event in self._last:
+            retained = [(listener.event, self._last[listener.event])]
+        else:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            _LOG.debug("No running event loop, sticky events are not replayed.")
+            return
+        for event_name, data in retained:
+            self._dispatch(listener, event_name, data)
 
-    def remove_listener(self, event: t.Union[str, Event], func: t.Callable):
+    def remove(self, listener: Listener):
+        """
+        Remove a listener returned by :meth:`add_listener`.
+        """
+        bucket = self.listeners.get(listener.event)
+        if bucket is not None:
+            bucket.pop(id(listener), None)
+            if not bucket:
+                del self.listeners[listener.event]
+
+    def remove_listener(self, event: t.Union[str, Event, None], func: t.Callable):
         """
         Remove listener for listeners list.
 
@@ -44,12 +240,123 @@ class Emitter:
             event name or class for event
         func: :class:`function`
             the function to callback event
+
+        Raises
+        ------
+        :class:`ValueError`
+            If the listener is not registered.
         """
         _LOG.debug(f"remove listener {event}")
-        event = event if isinstance(event, str) else event.__name__
-        self.listeners.remove([i for i in self.listeners if i["event"] == event and i["func"] == func])
+        event = _event_name(event)
+        for listener in self.listeners.get(event, {}).values():
+            if listener.func == func:
+                self.remove(listener)
+                return
+        raise ValueError(f"Listener {func!r} is not registered for {event}")
+
+    def add_event_hooks(self, obj: t.Any, weak: bool = False):
+        """
+        Register the methods of ``obj`` decorated with :func:`listener`.
+
+        The decorated methods are looked up once per class.
+
+        Parameters
+        ---------
+        obj: :class:`Any`
+            The object holding the decorated methods.
+        weak: :class:`bool`
+            Only keep weak references to ``obj``: its listeners are removed once it
+            is garbage collected instead of keeping it alive, e.g. for reloaded cogs.
+            Keep your own reference to ``obj`` when using it.
+        """
+        if id(obj) in self._owners:
+            self.remove_event_hooks(obj)
+
+        added: t.List[Listener] = []
+        for name, events, options in _class_hooks(type(obj)):
+            method = getattr(obj, name)
+            for ev in events or (None,):
+                added.append(self.add_listener(ev, method, weak=weak, **options))
+
+        if added:
+            finalizer = None
+            if weak:
+                try:
+                    finalizer = weakref.finalize(obj, self._prune_owner, id(obj), added)
+                except TypeError:
+                    _LOG.warning(f"{type(obj).__name__} does not support weak references, its hooks keep it alive")
+            self._owners[id(obj)] = (added, finalizer)
+
+    def remove_event_hooks(self, obj: t.Any):
+        """
+        Remove every listener registered by :meth:`add_event_hooks` for ``obj``.
+        """
+        listeners, finalizer = self._owners.pop(id(obj), ((), None))
+        if finalizer is not None:
+            finalizer.detach()
+        for listener in listeners:
+            self.remove(listener)
+            _LOG.debug(f"Removed listener for {listener.event}")
 
-    def emit(self, event: t.Union[str, t.Any], data: t.Any):
+    def _prune_owner(self, owner_id: int, listeners: t.List[Listener]):
+        # ids can be reused once the owner is gone, only drop our own entry
+        if self._owners.get(owner_id, (None,))[0] is listeners:
+            del self._owners[owner_id]
+        for listener in listeners:
+            self.remove(listener)
+        _LOG.debug(f"Pruned {len(listeners)} listeners of a collected owner")
+
+    def listener_count(self, event: t.Union[str, Event, None] = None) -> int:
+        """
+        Number of listeners registered for ``event`` or in total.
+        """
+        if event is None:
+            return sum(len(bucket) for bucket in self.listeners.values())
+        return len(self.listeners.get(_event_name(event), ()))
+
+    def has_listener(self, event: t.Union[str, Event]) -> bool:
+        """
+        Check if at least one listener is registered for an event.
+
+        Parameters
+        ---------
+        event: :class:`str` | :class:`Any`
+            event name or class for event
+        """
+        return _event_name(event) in self.listeners or ANY_EVENT in self.listeners
+
+    def wants(self, event: t.Union[str, Event]) -> bool:
+        """
+        Check if an event has listeners or is retained, events that are not wanted
+        do not need to be built.
+        """
+        return self.has_listener(event) or _event_name(event) in self.sticky
+
+    def set_sticky(self, *events: t.Union[str, t.Type[Event]], sticky: bool = True):
+        """
+        Start ( or stop, with ``sticky=False`` ) retaining the last value of ``events``.
+        """
+        for event in map(_event_name, events):
+            if sticky:
+                self.sticky.add(event)
+            else:
+                self.sticky.discard(event)
+                self._last.pop(event, None)
+
+    def last(self, event: t.Union[str, t.Type[Event]], default: t.Any = None) -> t.Any:
+        """
+        The last emitted value of a sticky event, ``default`` if none was emitted yet.
+
+        Example:
+            heartbeat = emitter.last(HeartBeatEvent)
+        """
+        return self._last.get(_event_name(event), default)
+
+    def clear_sticky(self):
+        """Forget every retained value, e.g. after switching node."""
+        self._last.clear()
+
+    def emit(self, event: t.Union[str, t.Any], data: t.Any) -> t.List[asyncio.Task]:
         """
         Emit for event dont use this.
 
@@ -59,15 +366,144 @@ class Emitter:
             event name or class for event
         data: :class:`function`
             the data is revers to function callback
+
+        Returns
+        -------
+        :class:`list`
+            The tasks running the handlers.
         """
-        event_name = event if isinstance(event, str) else event.__name__
-        events = [i for i in self.listeners if i["event"] == event_name]
-        for event in events:
-            _LOG.debug(f"dispatch {event} for {len(events)} listeners")
-            if asyncio.iscoroutinefunction(event["func"]):
-                self._loop.create_task(event["func"](data))
+        event_name = _event_name(event)
+        if event_name in self.sticky:
+            self._last[event_name] = data
+        tasks = []
+        events = [*self.listeners.get(event_name, {}).values(), *self.listeners.get(ANY_EVENT, {}).values()]
+        if events:
+            _LOG.debug(f"dispatch {event_name} for {len(events)} listeners")
+        frame = current_frame()
+        if frame is not None:
+            frame.events.append(event_name)
+        for listener in events:
+            task = self._dispatch(listener, event_name, data, frame)
+            if task is not None:
+                tasks.append(task)
+        return tasks
+
+    def _dispatch(
+        self, listener: Listener, event_name: str, data: t.Any, frame: t.Optional[FrameTrace] = None
+    ) -> t.Optional[asyncio.Task]:
+        func = listener.func
+        if func is None:
+            self.remove(listener)
+        elif asyncio.iscoroutinefunction(func):
+            if listener.drop_if_busy and listener.running >= listener.max_concurrency:
+                self._get_stats(func, event_name).dropped += 1
+                _LOG.debug(f"dropped {event_name} for a busy handler")
+                return None
+            # counted from scheduling so bursts see the handler as busy
+            listener.running += 1
+            if frame is not None and frame.hold():
+                coro = self._run_traced(frame, perf_counter_ns(), listener, func, event_name, data)
+            else:
+                coro = self._run(listener, func, event_name, data)
+            task = asyncio.get_running_loop().create_task(coro)
+            self._tasks.add(task)
+            task.add_done_callback(partial(self._task_done, listener))
+            return task
+        else:
+            _LOG.error("Events only async function")
+        return None
+
+    async def emit_wait(self, event: t.Union[str, t.Any], data: t.Any):
+        """
+        Emit an event and wait until every handler has finished.
+        """
+        tasks = self.emit(event, data)
+        if tasks:
+            await asyncio.wait(tasks)
+
+    def _get_stats(self, func: t.Callable, event_name: str) -> HandlerStats:
+        key = (getattr(func, "__qualname__", repr(func)), event_name)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = HandlerStats(*key)
+        return stats
+
+    async def _run(self, listener: Listener, func: t.Callable, event_name: str, data: t.Any):
+        stats = self._get_stats(func, event_name)
+        semaphore = listener.semaphore
+        if semaphore is not None:
+            async with semaphore:
+                await self._call(listener, func, stats, data)
+        else:
+            await self._call(listener, func, stats, data)
+
+    async def _run_traced(
+        self, frame: FrameTrace, scheduled: int, listener: Listener, func: t.Callable, event_name: str, data: t.Any
+    ):
+        start = perf_counter_ns()
+        frame.span("queue_wait", scheduled, start, event=event_name)
+        try:
+            await self._run(listener, func, event_name, data)
+        finally:
+            frame.span("handler", start, event=event_name, handler=getattr(func, "__qualname__", repr(func)))
+            frame.release()
+
+    def _task_done(self, listener: Listener, task: asyncio.Task):
+        listener.running -= 1
+        self._tasks.discard(task)
+
+    async def _call(self, listener: Listener, func: t.Callable, stats: HandlerStats, data: t.Any):
+        start = perf_counter()
+        try:
+            if listener.timeout is not None:
+                await asyncio.wait_for(func(data), listener.timeout)
             else:
-                _LOG.error("Events only async function")
+                await func(data)
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            _LOG.warning(f"Handler {stats.name} timed out after {listener.timeout}s on {stats.event}")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            stats.errors += 1
+            _LOG.exception(f"Error in handler {stats.name} for {stats.event}")
+        finally:
+            duration = perf_counter() - start
+            stats.calls += 1
+            stats.durations.append(duration)
+            if self.slow_handler_threshold is not None and duration >= self.slow_handler_threshold:
+                _LOG.warning(f"Slow handler {stats.name} for {stats.event}: {duration * 1000:.1f}ms")
+
+    def handler_stats(self) -> t.List[dict]:
+        """
+        Execution statistics per handler and event.
+
+        Returns
+        -------
+        :class:`list`
+            One dict per handler with ``name``, ``event``, ``calls``, ``errors``,
+            ``timeouts``, ``dropped`` and the ``p50``/``p95``/``p99``/``max`` durations in seconds.
+        """
+        return [stats.as_dict() for stats in self._stats.values()]
+
+    @property
+    def pending_tasks(self) -> int:
+        """Number of handler calls still running."""
+        return len(self._tasks)
+
+    async def drain(self, timeout: t.Optional[float] = None):
+        """
+        Wait for running handlers, cancelling those still running after ``timeout`` seconds.
+        """
+        if not self._tasks:
+            return
+        tasks = list(self._tasks)
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            _LOG.warning(f"Cancelled {len(pending)} handlers still running")
+            await asyncio.gather(*pending, return_exceptions=True)
 
     def on(self, event: t.Union[str, Event]):
         """
@@ -85,4 +521,4 @@ class Emitter:
             self.add_listener(event_name, func)
             return func
 
-        return decorator
\ No newline at end of file
+        return decorator
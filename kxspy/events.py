@@ -175,4 +175,18 @@ class ErrorEvent(Event):
     """
     op: int
     event: str
-    error: str
\ No newline at end of file
+    error: str
+
+@dataclass
+class PlayerJoined(Event):
+    """
+    Synthetic event on a player coming online ( built from presence updates ).
+    """
+    username: str
+
+@dataclass
+class PlayerLeft(Event):
+    """
+    Synthetic event on a player going offline ( built from presence updates ).
+    """
+    username: str
@@ -0,0 +1,21 @@
+class KxspyException(Exception):
+    """
+    Base exception for kxspy.
+    """
+
+class ChatError(KxspyException):
+    """
+    Raised when the Kxs network rejects a chat message.
+    """
+    def __init__(self, error: str) -> None:
+        super().__init__(error)
+        self.error = error
+
+class RestError(KxspyException):
+    """
+    Raised by :class:`RestApi` with ``raise_for_status`` when a request fails.
+    """
+    def __init__(self, status: int, response) -> None:
+        super().__init__(f"HTTP {status}: {response}")
+        self.status = status
+        self.response = response
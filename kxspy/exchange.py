@@ -0,0 +1,167 @@
+import json
+import asyncio
+import logging
+import typing as t
+from collections import OrderedDict, deque
+from time import monotonic
+from .events import Event, ExchangeGameAliveEvent
+from .tracing import current_frame, activate_frame, deactivate_frame
+
+_LOG = logging.getLogger("kxspy.exchange")
+
+EXCHANGE_OPS = (12, 13, 14, 15, 16)
+# join/online/offline are state transitions, only deduped against the previous frame of their lane
+STATE_OPS = (12, 13, 14)
+
+
+class ExchangePipeline:
+    """
+    Ordered delivery of the exchange key events ( ops 12 - 16 ).
+
+    Events are queued per key ( the exchange key and the game of the last
+    :class:`ExchangejoinEvent` ) and handed to the emitter one at a time: an event
+    is only emitted once every handler of the previous one has finished. A frame
+    identical to the previous frame of its queue is dropped as a replay; game
+    alive/end frames ( ops 15 - 16 ) are also dropped when already seen, but only
+    within ``replay_window`` seconds after a reconnect. Consecutive
+    :class:`ExchangeGameAliveEvent` waiting in a queue are collapsed into the latest one.
+
+    Parameters
+    ---------
+    emitter: :class:`Emitter`
+        The emitter to deliver to.
+    exchange_key: :class:`str`
+        Exchange key of the connection.
+    dedupe_size: :class:`int`
+        Number of recent frame fingerprints kept.
+    dedupe_ttl: :class:`float`
+        Seconds during which an identical frame is a duplicate.
+    replay_window: :class:`float`
+        Seconds after :meth:`reconnected` during which game alive/end frames
+        already seen are dropped.
+    """
+    def __init__(
+        self,
+        emitter,
+        exchange_key: t.Optional[str] = None,
+        dedupe_size: int = 1024,
+        dedupe_ttl: float = 60.0,
+        replay_window: float = 5.0,
+    ) -> None:
+        self.emitter = emitter
+        self.exchange_key = exchange_key
+        self.dedupe_size = dedupe_size
+        self.dedupe_ttl = dedupe_ttl
+        self.replay_window = replay_window
+        self.game_id: t.Optional[str] = None
+
+        # lane -> (fingerprint, time) of its previous frame
+        self._previous: "OrderedDict[t.Tuple[t.Optional[str], t.Optional[str]], t.Tuple[t.Tuple[int, str], float]]" = OrderedDict()
+        # fingerprints of recent game alive/end frames, checked after a reconnect
+        self._recent: "OrderedDict[t.Tuple[t.Any, t.Tuple[int, str]], float]" = OrderedDict()
+        self._replay_until = 0.0
+        # key -> pending [event name, event, traced frame]
+        self._lanes: t.Dict[t.Tuple[t.Optional[str], t.Optional[str]], t.Deque[t.List[t.Any]]] = {}
+        self._workers: t.Dict[t.Tuple[t.Optional[str], t.Optional[str]], asyncio.Task] = {}
+
+        self.duplicates = 0
+        self.coalesced = 0
+
+    def reconnected(self):
+        """Open the replay window, called by :class:`WS` when a connection is established."""
+        self._replay_until = monotonic() + self.replay_window
+
+    def _is_duplicate(self, key, op: int, d: t.Any) -> bool:
+        fingerprint = (op, json.dumps(d, sort_keys=True, separators=(",", ":"), default=str))
+        now = monotonic()
+
+        previous = self._previous.pop(key, None)
+        self._previous[key] = (fingerprint, now)
+        while len(self._previous) > self.dedupe_size:
+            self._previous.popitem(last=False)
+        if previous is not None and previous[0] == fingerprint and now - previous[1] < self.dedupe_ttl:
+            return True
+        if op in STATE_OPS:
+            return False
+
+        seen = self._recent.pop((key, fingerprint), None)
+        self._recent[(key, fingerprint)] = now
+        while len(self._recent) > self.dedupe_size:
+            self._recent.popitem(last=False)
+        return seen is not None and now < self._replay_until and now - seen < self.dedupe_ttl
+
+    def submit(self, op: int, d: t.Any, name: str, event: Event) -> bool:
+        """
+        Queue an exchange event, called by :class:`WS` for ops 12 - 16.
+
+        Returns
+        -------
+        :class:`bool`
+            ``False`` if the frame was dropped as a duplicate.
+        """
+        game_id = getattr(event, "gameId", None) if op == 12 else self.game_id
+        key = (self.exchange_key, game_id)
+        if self._is_duplicate(key, op, d):
+            self.duplicates += 1
+            _LOG.debug(f"Dropped duplicate exchange frame op {op}")
+            return False
+        self.game_id = game_id
+
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = self._lanes[key] = deque()
+
+        # the worker outlives the frame that started it, each event carries its own frame
+        frame = current_frame()
+        if frame is not None and not frame.hold():
+            frame = None
+
+        if isinstance(event, ExchangeGameAliveEvent) and lane and isinstance(lane[-1][1], ExchangeGameAliveEvent):
+            replaced = lane[-1][2]
+            lane[-1][1:] = [event, frame]
+            if replaced is not None:
+                replaced.release()
+            self.coalesced += 1
+        else:
+            lane.append([name, event, frame])
+
+        worker = self._workers.get(key)
+        if worker is None or worker.done():
+            self._workers[key] = asyncio.get_running_loop().create_task(self._drain(key, lane))
+        return True
+
+    async def _drain(self, key, lane: t.Deque[t.List[t.Any]]):
+        try:
+            while lane:
+                name, event, frame = lane.popleft()
+                token = activate_frame(frame)
+                try:
+                    await self.emitter.emit_wait(name, event)
+                except Exception:
+                    _LOG.exception(f"Error while delivering {name}")
+                finally:
+                    deactivate_frame(token)
+                    if frame is not None:
+                        frame.release()
+        finally:
+            if self._lanes.get(key) is lane and not lane:
+                del self._lanes[key]
+                self._workers.pop(key, None)
+
+    @property
+    def pending(self) -> int:
+        """Number of events waiting for delivery."""
+        return sum(len(lane) for lane in self._lanes.values())
+
+    async def close(self):
+        """Cancel pending deliveries."""
+        workers = [w for w in self._workers.values() if not w.done()]
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._workers.clear()
+        for lane in self._lanes.values():
+            for _, _, frame in lane:
+                if frame is not None:
+                    frame.release()
+        self._lanes.clear()
@@ -0,0 +1,285 @@
+import asyncio
+import logging
+import typing as t
+from time import monotonic
+import aiohttp
+from .rest import RestApi
+
+_LOG = logging.getLogger("kxspy.failover")
+
+
+class Endpoint:
+    """
+    A Kxs network node.
+
+    Parameters
+    ---------
+    ws_url: :class:`str`
+        Websocket url of the node.
+    rest_url: :class:`str`
+        REST url of the node.
+    """
+    __slots__ = ("ws_url", "rest_url", "latency", "failures", "ws_latency", "ws_failures", "rest")
+
+    def __init__(self, ws_url: str, rest_url: str) -> None:
+        self.ws_url = ws_url
+        self.rest_url = rest_url
+        # EWMA of the REST latency in milliseconds, None until probed
+        self.latency: t.Optional[float] = None
+        self.failures = 0
+        # EWMA of the websocket round trip, only measured while connected to the node
+        self.ws_latency: t.Optional[float] = None
+        self.ws_failures = 0
+        self.rest: t.Optional[RestApi] = None
+
+    @property
+    def healthy(self) -> bool:
+        return self.failures == 0 and self.latency is not None
+
+    def __repr__(self) -> str:
+        return (
+            f"<Endpoint ws_url={self.ws_url!r} latency={self.latency} failures={self.failures} "
+            f"ws_latency={self.ws_latency} ws_failures={self.ws_failures}>"
+        )
+
+
+class EndpointPool:
+    """
+    Picks the fastest healthy node among several endpoints and moves a
+    :class:`Client` away from a node that degrades.
+
+    Every node is probed with :meth:`RestApi.get_rest_latency`, the results are
+    smoothed with an EWMA and nodes are only compared on it. While a client is
+    attached, its node is also checked with :meth:`WS.measure_latency`, kept
+    apart in :attr:`Endpoint.ws_latency` since the other nodes have no websocket
+    samples. After ``max_failures`` failed checks of either kind the client
+    reconnects to the best other node; when another node is ``degrade_ratio``
+    times faster it moves there, at most once per ``cooldown``. Connection
+    failures of :class:`WS` also rotate to the next best node. After switching
+    node, the game the client was in is joined again.
+
+    Parameters
+    ---------
+    endpoints: :class:`list`
+        :class:`Endpoint` or ``(ws_url, rest_url)`` tuples.
+    interval: :class:`float`
+        Seconds between two health checks.
+    probe_timeout: :class:`float`
+        Seconds before a probe counts as failed.
+    alpha: :class:`float`
+        Weight of the last sample in the EWMA.
+    degrade_ratio: :class:`float`
+        Latency ratio between the current and the best node that triggers a migration.
+    min_gain: :class:`float`
+        Minimum latency gain in milliseconds for a migration.
+    max_failures: :class:`int`
+        Failed checks of the current node before migrating.
+    cooldown: :class:`float`
+        Seconds after a migration during which latency alone does not trigger another one.
+    """
+    def __init__(
+        self,
+        endpoints: t.Iterable[t.Union[Endpoint, t.Tuple[str, str]]],
+        interval: float = 30.0,
+        probe_timeout: float = 5.0,
+        alpha: float = 0.3,
+        degrade_ratio: float = 2.0,
+        min_gain: float = 50.0,
+        max_failures: int = 2,
+        cooldown: float = 300.0,
+    ) -> None:
+        self.endpoints: t.List[Endpoint] = [e if isinstance(e, Endpoint) else Endpoint(*e) for e in endpoints]
+        if not self.endpoints:
+            raise ValueError("EndpointPool needs at least one endpoint.")
+        self.interval = interval
+        self.probe_timeout = probe_timeout
+        self.alpha = alpha
+        self.degrade_ratio = degrade_ratio
+        self.min_gain = min_gain
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+
+        self.current: t.Optional[Endpoint] = None
+        self.migrations = 0
+        self._client = None
+        self._session: t.Optional[aiohttp.ClientSession] = None
+        self._monitor_task: t.Optional[asyncio.Task] = None
+        self._identified_url: t.Optional[str] = None
+        self._cooldown_until = 0.0
+
+    def _ewma(self, previous: t.Optional[float], latency: float) -> float:
+        if previous is None:
+            return latency
+        return self.alpha * latency + (1 - self.alpha) * previous
+
+    def _record(self, endpoint: Endpoint, latency: t.Optional[float]):
+        if latency is None:
+            endpoint.failures += 1
+            return
+        endpoint.failures = 0
+        endpoint.latency = self._ewma(endpoint.latency, latency)
+
+    def _record_ws(self, endpoint: Endpoint, latency: t.Optional[float]):
+        if latency is None:
+            endpoint.ws_failures += 1
+            return
+        endpoint.ws_failures = 0
+        endpoint.ws_latency = self._ewma(endpoint.ws_latency, latency)
+
+    async def _probe_one(self, endpoint: Endpoint):
+        if endpoint.rest is None:
+            endpoint.rest = RestApi(endpoint.rest_url, session=self._session)
+        try:
+            latency = await asyncio.wait_for(endpoint.rest.get_rest_latency(), self.probe_timeout)
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError, ValueError) as e:
+            _LOG.debug(f"Probe of {endpoint.rest_url} failed: {e}")
+            latency = None
+        if latency is not None and latency < 0:
+            latency = None
+        self._record(endpoint, latency)
+
+    async def probe(self):
+        """Probe every endpoint concurrently."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        await asyncio.gather(*(self._probe_one(e) for e in self.endpoints))
+
+    def best(self, endpoints: t.Optional[t.List[Endpoint]] = None) -> Endpoint:
+        """The healthy endpoint with the lowest latency, or the least failing one."""
+        endpoints = self.endpoints if endpoints is None else endpoints
+        healthy = [e for e in endpoints if e.healthy]
+        if healthy:
+            return min(healthy, key=lambda e: e.latency)
+        return min(endpoints, key=lambda e: e.failures)
+
+    def next_ws_url(self, failed_url: str) -> str:
+        """
+        Called by :class:`WS` when a connection attempt fails, returns the url to try next.
+        """
+        for endpoint in self.endpoints:
+            if endpoint.ws_url == failed_url:
+                endpoint.failures += 1
+        endpoint = self.best()
+        if endpoint.ws_url == failed_url and len(self.endpoints) > 1:
+            # every node is failing, rotate
+            index = next(i for i, e in enumerate(self.endpoints) if e.ws_url == failed_url)
+            endpoint = self.endpoints[(index + 1) % len(self.endpoints)]
+        self.current = endpoint
+        if self._client is not None:
+            self._client.rest.rest_uri = endpoint.rest_url
+        return endpoint.ws_url
+
+    async def attach(self, client):
+        """
+        Probe the endpoints, point ``client`` to the fastest one and start monitoring.
+        Called by :meth:`Client.connect` when the client has endpoints.
+        """
+        self._client = client
+        client.ws.failover = self
+        # attach runs on every connect(), keep a single listener
+        try:
+            client.emitter.remove_listener("IdentifyEvent", self._on_identify)
+        except ValueError:
+            pass
+        client.emitter.add_listener("IdentifyEvent", self._on_identify)
+        await self.probe()
+        self._use(self.best())
+        if self._monitor_task is None or self._monitor_task.done():
+            self._monitor_task = asyncio.get_running_loop().create_task(self._monitor())
+
+    async def _on_identify(self, _event):
+        ws = self._client.ws
+        previous, self._identified_url = self._identified_url, ws.ws_url
+        if previous is None or previous == ws.ws_url:
+            return
+        # the new node does not know about the game the client was in
+        games = getattr(self._client, "games", None)
+        if games is not None and games.current is not None:
+            await ws.send({"op": 3, "d": {"gameId": games.current.gameId, "user": self._client.username}})
+
+    def _use(self, endpoint: Endpoint):
+        self.current = endpoint
+        self._client.ws.ws_url = endpoint.ws_url
+        self._client.rest.rest_uri = endpoint.rest_url
+        _LOG.info(f"Using Kxs endpoint {endpoint.ws_url} ({endpoint.latency} ms)")
+
+    async def _monitor(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                _LOG.exception("Endpoint health check failed")
+
+    async def check(self):
+        """Run one health check, migrating the client if needed."""
+        await self.probe()
+        current = self.current
+        ws = self._client.ws
+        if ws.is_connected:
+            try:
+                latency = await ws.measure_latency(timeout=self.probe_timeout)
+            except ConnectionError:
+                latency = None
+            self._record_ws(current, latency)
+
+        if current.failures >= self.max_failures or current.ws_failures >= self.max_failures:
+            others = [e for e in self.endpoints if e is not current]
+            if not others:
+                return
+            best = self.best(others)
+            reason = f"{max(current.failures, current.ws_failures)} failed checks"
+        else:
+            best = self.best()
+            if best is current or monotonic() < self._cooldown_until:
+                return
+            if not (
+                current.latency is not None and best.latency is not None
+                and current.latency > best.latency * self.degrade_ratio
+                and current.latency - best.latency > self.min_gain
+            ):
+                return
+            reason = f"REST latency {current.latency:.0f}ms vs {best.latency:.0f}ms"
+        await self.migrate(best, reason)
+
+    async def migrate(self, endpoint: Endpoint, reason: str = "manual"):
+        """Reconnect the client to ``endpoint``."""
+        _LOG.warning(f"Migrating from {self.current.ws_url} to {endpoint.ws_url}: {reason}")
+        self.migrations += 1
+        self._cooldown_until = monotonic() + self.cooldown
+        self._use(endpoint)
+
+        ws = self._client.ws
+        # state of the previous node
+        ws.emitter.clear_sticky()
+        identified = asyncio.get_running_loop().create_future()
+
+        async def on_identify(_event):
+            if not identified.done():
+                identified.set_result(True)
+
+        ws.emitter.add_listener("IdentifyEvent", on_identify)
+        try:
+            await ws.reconnect()
+            await asyncio.wait_for(identified, self.probe_timeout)
+        except asyncio.TimeoutError:
+            _LOG.error(f"No identify from {endpoint.ws_url} after migration.")
+            return
+        finally:
+            ws.emitter.remove_listener("IdentifyEvent", on_identify)
+
+    async def close(self):
+        """Stop monitoring and close the probe session."""
+        if self._client is not None:
+            try:
+                self._client.emitter.remove_listener("IdentifyEvent", self._on_identify)
+            except ValueError:
+                pass
+        if self._monitor_task is not None:
+            self._monitor_task.cancel()
+            await asyncio.gather(self._monitor_task, return_exceptions=True)
+            self._monitor_task = None
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
@@ -0,0 +1,224 @@
+import json
+import uuid
+import asyncio
+import logging
+import typing as t
+from time import time
+from aiohttp import web, WSMsgType
+
+_LOG = logging.getLogger("kxspy.fakeserver")
+
+
+class _Peer:
+    __slots__ = ("ws", "uuid", "username", "exchange_key", "game_id", "voice", "delayed")
+
+    def __init__(self, ws: web.WebSocketResponse) -> None:
+        self.ws = ws
+        self.uuid = str(uuid.uuid4())
+        self.username: t.Optional[str] = None
+        self.exchange_key: t.Optional[str] = None
+        self.game_id: t.Optional[str] = None
+        self.voice = False
+        # (due time, frame) waiting for the simulated latency
+        self.delayed: "asyncio.Queue[t.Tuple[float, str]]" = asyncio.Queue()
+
+
+class FakeKxsServer:
+    """
+    Local stand-in of the Kxs network for tests, benchmarks and load tests.
+
+    Implements the websocket opcodes used by :class:`WS` ( hello/identify/heartbeat,
+    game join/leave, kills, chat, voice ) and the ``/online-count`` and ``/broadcast``
+    REST routes. Chat, kills and voice data are relayed to the other players of the
+    same game; exchange events ( ops 12 - 14 ) are sent to peers sharing an exchange key.
+
+    Parameters
+    ---------
+    host: :class:`str`
+        Interface to bind.
+    port: :class:`int`
+        Port to bind, ``0`` for a random free port.
+    latency: :class:`float`
+        Seconds every frame sent spends in flight, to simulate a distant node.
+        Frames keep their order and do not hold up the handling of the next ones.
+    heartbeat_interval: :class:`int`
+        Value sent in the hello ( op 10 ).
+
+    Example:
+        async with FakeKxsServer() as server:
+            client = kxspy.Client(ws_url=server.ws_url, rest_url=server.rest_url)
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, heartbeat_interval: int = 3000) -> None:
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.heartbeat_interval = heartbeat_interval
+        self.version = "fake"
+        self.peers: t.Set[_Peer] = set()
+        self.frames_in = 0
+        self.frames_out = 0
+
+        self._runner: t.Optional[web.AppRunner] = None
+        self.app = web.Application()
+        self.app.router.add_get("/", self._ws_handler)
+        self.app.router.add_get("/online-count", self._online_count)
+        self.app.router.add_get("/getLatestVersion", self._latest_version)
+        self.app.router.add_post("/broadcast", self._broadcast)
+
+    @property
+    def ws_url(self) -> str:
+        return f"ws://{self.host}:{self.port}/"
+
+    @property
+    def rest_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        """Start listening, :attr:`port` is updated when it was ``0``."""
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        _LOG.info(f"Fake Kxs server listening on {self.ws_url}")
+
+    async def close(self):
+        for peer in list(self.peers):
+            await peer.ws.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _send(self, peer: _Peer, payload: dict):
+        if self.latency:
+            peer.delayed.put_nowait((asyncio.get_running_loop().time() + self.latency, json.dumps(payload)))
+            return
+        await self._write(peer, json.dumps(payload))
+
+    async def _write(self, peer: _Peer, frame: str):
+        if peer.ws.closed:
+            return
+        try:
+            await peer.ws.send_str(frame)
+            self.frames_out += 1
+        except ConnectionResetError:
+            pass
+
+    async def _delayed_writer(self, peer: _Peer):
+        loop = asyncio.get_running_loop()
+        while True:
+            due, frame = await peer.delayed.get()
+            if due > loop.time():
+                await asyncio.sleep(due - loop.time())
+            await self._write(peer, frame)
+
+    async def _fanout(self, peers: t.Iterable[_Peer], payload: dict):
+        await asyncio.gather(*(self._send(p, payload) for p in peers))
+
+    def _game_peers(self, peer: _Peer) -> t.List[_Peer]:
+        if peer.game_id is None:
+            return []
+        return [p for p in self.peers if p is not peer and p.game_id == peer.game_id]
+
+    def _exchange_peers(self, peer: _Peer) -> t.List[_Peer]:
+        if not peer.exchange_key:
+            return []
+        return [p for p in self.peers if p is not peer and p.exchange_key == peer.exchange_key]
+
+    async def broadcast(self, msg: str):
+        """Send op 87 to every peer."""
+        await self._fanout(self.peers, {"op": 87, "d": {"msg": msg}})
+
+    async def game_alive(self, game_id: str, alive: int):
+        """Send op 15 to the players of ``game_id``."""
+        peers = [p for p in self.peers if p.game_id == game_id]
+        await self._fanout(peers, {"op": 15, "d": {"alive": alive}})
+
+    async def game_end(self, game_id: str, data: dict):
+        """Send op 16 with ``data`` ( an ``ExchangeGameEnd`` payload ) to the players of ``game_id``."""
+        peers = [p for p in self.peers if p.game_id == game_id]
+        await self._fanout(peers, {"op": 16, "d": {"data": data}})
+
+    async def _ws_handler(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        peer = _Peer(ws)
+        self.peers.add(peer)
+        writer = asyncio.get_running_loop().create_task(self._delayed_writer(peer)) if self.latency else None
+        await self._send(peer, {"op": 10, "d": {"heartbeat_interval": self.heartbeat_interval}})
+        try:
+            async for msg in ws:
+                if msg.type == WSMsgType.TEXT:
+                    self.frames_in += 1
+                    try:
+                        await self._handle(peer, json.loads(msg.data))
+                    except Exception:
+                        _LOG.exception("Fake server failed to handle a frame")
+                elif msg.type == WSMsgType.ERROR:
+                    break
+        finally:
+            self.peers.discard(peer)
+            if writer is not None:
+                writer.cancel()
+            if peer.username:
+                await self._fanout(self._exchange_peers(peer), {"op": 14, "d": {"username": peer.username}})
+        return ws
+
+    async def _handle(self, peer: _Peer, payload: dict):
+        op = payload.get("op")
+        d = payload.get("d", {})
+
+        if op == 1:
+            players = [p.username for p in self.peers if p.username]
+            await self._send(peer, {"op": 1, "d": {"ok": True, "count": len(players), "players": players}})
+        elif op == 2:
+            peer.username = d.get("username")
+            peer.exchange_key = d.get("exchangeKey")
+            peer.voice = bool(d.get("isVoiceChat"))
+            await self._send(peer, {"op": 2, "d": {"uuid": peer.uuid}})
+            await self._fanout(self._exchange_peers(peer), {"op": 13, "d": {"username": peer.username, "v": d.get("v")}})
+        elif op == 3:
+            peer.game_id = d.get("gameId")
+            await self._send(peer, {"op": 3, "d": {"ok": True, "usernameChanged": False}})
+            await self._fanout(self._exchange_peers(peer), {"op": 12, "d": {"gameId": peer.game_id, "exchangeKey": peer.exchange_key}})
+        elif op == 4:
+            left = self._game_peers(peer)
+            peer.game_id = None
+            await self._send(peer, {"op": 4, "d": {"ok": True}})
+            await self._fanout(left, {"op": 4, "d": {"left": peer.username}})
+        elif op == 5:
+            kill = {"killer": d.get("killer"), "killed": d.get("killed"), "timestamp": int(time() * 1000)}
+            await self._fanout([peer, *self._game_peers(peer)], {"op": 5, "d": kill})
+        elif op == 6:
+            await self._send(peer, {"op": 6, "d": {"v": self.version}})
+        elif op == 7:
+            await self._send(peer, {"op": 7, "d": {"ok": True}})
+            message = {"user": peer.username, "text": d.get("text"), "timestamp": int(time() * 1000), "system": False}
+            await self._fanout(self._game_peers(peer), {"op": 7, "d": message})
+        elif op == 98:
+            peer.voice = bool(d.get("isVoiceChat"))
+            await self._send(peer, {"op": 98, "d": {"ok": True}})
+            await self._fanout(self._game_peers(peer), {"op": 98, "d": {"user": peer.username, "isVoiceChat": peer.voice}})
+        elif op == 99:
+            listeners = [p for p in self._game_peers(peer) if p.voice]
+            await self._fanout(listeners, {"op": 99, "d": d, "u": peer.uuid})
+        else:
+            await self._send(peer, {"op": op, "d": {"error": f"Unknown opcode {op}"}})
+
+    async def _online_count(self, request: web.Request) -> web.Response:
+        return web.json_response({"count": sum(1 for p in self.peers if p.username)})
+
+    async def _latest_version(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.version, content_type="text/plain")
+
+    async def _broadcast(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        await self.broadcast(data.get("msg", ""))
+        return web.json_response({"ok": True})
@@ -0,0 +1,200 @@
+import logging
+import typing as t
+from collections import OrderedDict
+from time import time
+from .presence import _player_name
+from .events import (
+    ConfirmGameStart,
+    GameStart,
+    GameEnd,
+    ConfirmGameEnd,
+    KillEvent,
+    ExchangeGameAliveEvent,
+    ExchangeGameEnd,
+)
+
+_LOG = logging.getLogger("kxspy.game")
+
+JOINING = "joining"
+STARTED = "started"
+ENDED = "ended"
+
+
+class GameSession:
+    """
+    State of one game, updated from the websocket events.
+
+    Attributes
+    ---------
+    gameId: :class:`str`
+        The game id.
+    state: :class:`str`
+        ``"joining"``, ``"started"`` or ``"ended"``.
+    players: :class:`set`
+        Players announced by :class:`GameStart`.
+    alive: :class:`set`
+        Players not killed yet.
+    alive_count: :class:`int`
+        Last alive count from :class:`ExchangeGameAliveEvent`, or ``len(alive)``.
+    kills: :class:`list`
+        The :class:`KillEvent` of this game.
+    outcome: :class:`ExchangeGameEnd`
+        Result of the game when received.
+    """
+    __slots__ = (
+        "gameId", "state", "players", "alive", "_alive_count", "kills",
+        "outcome", "joined_at", "started_at", "ended_at",
+    )
+
+    def __init__(self, gameId: str) -> None:
+        self.gameId = gameId
+        self.state = JOINING
+        self.players: t.Set[str] = set()
+        self.alive: t.Set[str] = set()
+        self._alive_count: t.Optional[int] = None
+        self.kills: t.List[KillEvent] = []
+        self.outcome: t.Optional[ExchangeGameEnd] = None
+        self.joined_at = time()
+        self.started_at: t.Optional[float] = None
+        self.ended_at: t.Optional[float] = None
+
+    @property
+    def alive_count(self) -> int:
+        return self._alive_count if self._alive_count is not None else len(self.alive)
+
+    @property
+    def duration(self) -> t.Optional[float]:
+        """Seconds since the start of the game, or its total length once ended."""
+        if self.started_at is None:
+            return None
+        return (self.ended_at or time()) - self.started_at
+
+    @property
+    def finished(self) -> bool:
+        return self.state == ENDED
+
+    def _start(self, players: t.Iterable[str]):
+        self.state = STARTED
+        self.started_at = self.started_at or time()
+        players = list(players)
+        self.players.update(players)
+        self.alive.update(players)
+
+    def _end(self):
+        if self.state != ENDED:
+            self.state = ENDED
+            self.ended_at = time()
+
+    def __repr__(self) -> str:
+        return (
+            f"<GameSession gameId={self.gameId!r} state={self.state!r} "
+            f"alive={self.alive_count} kills={len(self.kills)}>"
+        )
+
+
+class GameTracker:
+    """
+    Keeps a :class:`GameSession` per gameId.
+
+    The session of the game joined with :meth:`Client.join_game` is :attr:`current`;
+    kills and game start/end events are applied to it. Finished sessions are kept
+    for lookups, the oldest ones are dropped past ``max_finished``.
+
+    Parameters
+    ---------
+    emitter: :class:`Emitter`
+        The emitter to listen on, ``None`` to only follow :meth:`join` and :meth:`leave`.
+    max_finished: :class:`int`
+        Number of finished sessions kept.
+    """
+    def __init__(self, emitter=None, max_finished: int = 100) -> None:
+        self.max_finished = max_finished
+        self.current: t.Optional[GameSession] = None
+        self._sessions: "OrderedDict[str, GameSession]" = OrderedDict()
+        self._finished: "OrderedDict[str, None]" = OrderedDict()
+
+        if emitter is None:
+            return
+        emitter.add_listener(ConfirmGameStart, self._on_confirm_start)
+        emitter.add_listener(GameStart, self._on_game_start)
+        emitter.add_listener(GameEnd, self._on_game_end)
+        emitter.add_listener(ConfirmGameEnd, self._on_confirm_end)
+        emitter.add_listener(KillEvent, self._on_kill)
+        emitter.add_listener(ExchangeGameAliveEvent, self._on_alive)
+        emitter.add_listener(ExchangeGameEnd, self._on_exchange_end)
+
+    def get(self, gameId: str) -> t.Optional[GameSession]:
+        """Return the session of ``gameId``."""
+        return self._sessions.get(gameId)
+
+    def __contains__(self, gameId: str) -> bool:
+        return gameId in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    @property
+    def sessions(self) -> t.List[GameSession]:
+        return list(self._sessions.values())
+
+    def _session(self, gameId: str) -> GameSession:
+        session = self._sessions.get(gameId)
+        if session is None or session.finished:
+            # a new join of a finished game starts a fresh session
+            self._finished.pop(gameId, None)
+            session = self._sessions[gameId] = GameSession(gameId)
+        return session
+
+    def join(self, gameId: str) -> GameSession:
+        """Make ``gameId`` the current session, called by :meth:`Client.join_game`."""
+        if self.current is not None and self.current.gameId != gameId:
+            self.finish(self.current)
+        self.current = self._session(gameId)
+        return self.current
+
+    def leave(self):
+        """Finish the current session, called by :meth:`Client.leave_game`."""
+        if self.current is not None:
+            self.finish(self.current)
+
+    def finish(self, session: GameSession):
+        """Mark ``session`` as ended and apply the retention limit."""
+        session._end()
+        if self.current is session:
+            self.current = None
+        self._finished[session.gameId] = None
+        self._finished.move_to_end(session.gameId)
+        while len(self._finished) > self.max_finished:
+            gameId, _ = self._finished.popitem(last=False)
+            self._sessions.pop(gameId, None)
+            _LOG.debug(f"Dropped finished game session {gameId}")
+
+    async def _on_confirm_start(self, event: ConfirmGameStart):
+        if not event.ok and self.current is not None and self.current.state == JOINING:
+            _LOG.warning(f"Join of game {self.current.gameId} was not confirmed")
+
+    async def _on_game_start(self, event: GameStart):
+        if self.current is not None:
+            self.current._start(filter(None, map(_player_name, event.players or ())))
+
+    async def _on_game_end(self, event: GameEnd):
+        if self.current is not None:
+            self.current.alive.discard(event.left)
+
+    async def _on_confirm_end(self, event: ConfirmGameEnd):
+        if self.current is not None:
+            self.finish(self.current)
+
+    async def _on_kill(self, event: KillEvent):
+        if self.current is not None:
+            self.current.kills.append(event)
+            self.current.alive.discard(event.killed)
+
+    async def _on_alive(self, event: ExchangeGameAliveEvent):
+        if self.current is not None:
+            self.current._alive_count = event.alive
+
+    async def _on_exchange_end(self, event: ExchangeGameEnd):
+        if self.current is not None:
+            self.current.outcome = event
+            self.finish(self.current)
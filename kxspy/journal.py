@@ -0,0 +1,292 @@
+import os
+import json
+import mmap
+import struct
+import logging
+import typing as t
+from bisect import bisect_left, bisect_right
+from time import time
+from . import events as _events
+from .events import Event
+from .objects import Stuff
+from .ws import OP_EVENT_NAMES
+
+_LOG = logging.getLogger("kxspy.journal")
+
+SEGMENT_SUFFIX = ".kxj"
+INDEX_SUFFIX = ".kxi"
+DEFAULT_SEGMENT_SIZE = 64 * 1024 * 1024
+
+# record: <length of payload> <timestamp> <op> then payload (compact json)
+_RECORD = struct.Struct("<IdB")
+# index entry: <timestamp> <op> <offset of the record in the segment>
+_INDEX = struct.Struct("<dBQ")
+
+EVENT_OPS = {name: op for op, name in OP_EVENT_NAMES.items()}
+EVENT_OPS.update({
+    "ConfirmGameStart": 3,
+    "ConfirmGameEnd": 4,
+    "ConfirmChatMessage": 7,
+    "ConfirmVoiceChatUpdate": 98,
+    "ErrorEvent": 0,
+})
+
+
+def _encode(event: Event) -> bytes:
+    body = {"e": type(event).__name__, "d": vars(event)}
+    return json.dumps(body, separators=(",", ":"), default=vars).encode()
+
+
+def _decode(payload: t.Union[bytes, memoryview]) -> Event:
+    body = json.loads(bytes(payload))
+    name, d = body["e"], body["d"]
+    cls = getattr(_events, name, None)
+    if cls is None or not (isinstance(cls, type) and issubclass(cls, Event)):
+        raise ValueError(f"Unknown event in journal: {name}")
+    if name == "ExchangeGameEnd" and isinstance(d.get("stuff"), dict):
+        d["stuff"] = Stuff.from_kwargs(**d["stuff"])
+    return cls.from_kwargs(**d)
+
+
+class Journal:
+    """
+    Append-only event journal stored as rolling binary segments.
+
+    Every segment ``<seq>.kxj`` holds length-prefixed records and comes with a
+    ``<seq>.kxi`` index of ``(timestamp, op, offset)`` entries used by
+    :class:`JournalReader` to seek by time range. Timestamps only increase
+    within a segment, an older timestamp ( e.g. after a clock step back )
+    starts a new segment.
+
+    Parameters
+    ---------
+    path: :class:`str`
+        Directory where segments are written.
+    max_segment_size: :class:`int`
+        Size in bytes after which a new segment is started.
+    buffer_size: :class:`int`
+        Write buffer size of the segment file.
+    """
+    def __init__(self, path: str, max_segment_size: int = DEFAULT_SEGMENT_SIZE, buffer_size: int = 1024 * 1024) -> None:
+        self.path = path
+        self.max_segment_size = max_segment_size
+        self.buffer_size = buffer_size
+        os.makedirs(path, exist_ok=True)
+
+        self._seq = max((s for s in _list_segments(path)), default=-1)
+        self._segment: t.Optional[t.BinaryIO] = None
+        self._index: t.Optional[t.BinaryIO] = None
+        self._offset = 0
+        self._last_timestamp: t.Optional[float] = None
+        self.written = 0
+
+    def _roll(self):
+        self._close_segment()
+        self._seq += 1
+        base = os.path.join(self.path, f"{self._seq:08d}")
+        self._segment = open(base + SEGMENT_SUFFIX, "wb", buffering=self.buffer_size)
+        self._index = open(base + INDEX_SUFFIX, "wb", buffering=self.buffer_size // 8 or 1)
+        self._offset = 0
+        self._last_timestamp = None
+        _LOG.debug(f"Opened journal segment {base}{SEGMENT_SUFFIX}")
+
+    def _close_segment(self):
+        for f in (self._segment, self._index):
+            if f is not None:
+                f.close()
+        self._segment = self._index = None
+
+    def write(self, event: Event, timestamp: t.Optional[float] = None):
+        """
+        Append an event to the journal.
+
+        Parameters
+        ---------
+        event: :class:`Event`
+            The event to store.
+        timestamp: :class:`float`
+            Unix time of the event, defaults to now.
+        """
+        if timestamp is None:
+            timestamp = time()
+        payload = _encode(event)
+        op = EVENT_OPS.get(type(event).__name__, 0)
+
+        if self._segment is None or self._offset >= self.max_segment_size:
+            self._roll()
+        elif timestamp < self._last_timestamp:
+            # the reader bisects the index, keep every segment sorted
+            _LOG.debug(f"Timestamp {timestamp} is older than {self._last_timestamp}, starting a new segment.")
+            self._roll()
+
+        self._segment.write(_RECORD.pack(len(payload), timestamp, op))
+        self._segment.write(payload)
+        self._index.write(_INDEX.pack(timestamp, op, self._offset))
+        self._offset += _RECORD.size + len(payload)
+        self._last_timestamp = timestamp
+        self.written += 1
+
+    async def on_event(self, event: Event):
+        """Listener usable with :meth:`Emitter.add_listener`."""
+        self.write(event)
+
+    def attach(self, emitter, *events: t.Union[str, t.Type[Event]]):
+        """
+        Record the given events emitted by ``emitter``.
+
+        Example:
+            journal.attach(client.emitter, KillEvent, ChatMessage, ExchangeGameEnd)
+        """
+        for ev in events:
+            emitter.add_listener(ev, self.on_event)
+
+    def detach(self, emitter, *events: t.Union[str, t.Type[Event]]):
+        """Stop recording the given events."""
+        for ev in events:
+            emitter.remove_listener(ev, self.on_event)
+
+    def flush(self):
+        """Flush buffered records to disk."""
+        for f in (self._segment, self._index):
+            if f is not None:
+                f.flush()
+
+    def close(self):
+        """Flush and close the current segment."""
+        self._close_segment()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class JournalReader:
+    """
+    Reads journal segments through ``mmap`` without loading whole files.
+
+    Parameters
+    ---------
+    path: :class:`str`
+        Directory containing the segments.
+    """
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    @property
+    def segments(self) -> t.List[int]:
+        return sorted(_list_segments(self.path))
+
+    def _load_index(self, seq: int) -> t.Tuple[t.List[float], t.List[int], t.List[int]]:
+        base = os.path.join(self.path, f"{seq:08d}")
+        stamps, ops, offsets = [], [], []
+        try:
+            with open(base + INDEX_SUFFIX, "rb") as f:
+                data = f.read()
+            usable = len(data) - len(data) % _INDEX.size
+            for ts, op, off in _INDEX.iter_unpack(data[:usable]):
+                stamps.append(ts)
+                ops.append(op)
+                offsets.append(off)
+        except FileNotFoundError:
+            _LOG.warning(f"Missing index for segment {seq}, rebuilding from records.")
+            with _open_map(base + SEGMENT_SUFFIX) as mm:
+                pos = 0
+                while mm is not None and pos + _RECORD.size <= len(mm):
+                    length, ts, op = _RECORD.unpack_from(mm, pos)
+                    stamps.append(ts)
+                    ops.append(op)
+                    offsets.append(pos)
+                    pos += _RECORD.size + length
+        return stamps, ops, offsets
+
+    def scan(
+        self,
+        start: t.Optional[float] = None,
+        end: t.Optional[float] = None,
+        ops: t.Optional[t.Iterable[int]] = None,
+    ) -> t.Iterator[t.Tuple[float, int, Event]]:
+        """
+        Iterate over stored events.
+
+        Parameters
+        ---------
+        start: :class:`float`
+            Only events at or after this unix time.
+        end: :class:`float`
+            Only events at or before this unix time.
+        ops: :class:`list`
+            Only events with these opcodes.
+
+        Yields
+        -------
+        :class:`tuple`
+            ``(timestamp, op, event)``
+        """
+        ops = set(ops) if ops is not None else None
+        for seq in self.segments:
+            stamps, seg_ops, offsets = self._load_index(seq)
+            if not stamps:
+                continue
+            if all(a <= b for a, b in zip(stamps, stamps[1:])):
+                if (start is not None and stamps[-1] < start) or (end is not None and stamps[0] > end):
+                    continue
+                lo = bisect_left(stamps, start) if start is not None else 0
+                hi = bisect_right(stamps, end) if end is not None else len(stamps)
+                indices = range(lo, hi)
+            else:
+                # unsorted index, fall back to a linear scan
+                indices = [
+                    i for i, ts in enumerate(stamps)
+                    if (start is None or ts >= start) and (end is None or ts <= end)
+                ]
+
+            base = os.path.join(self.path, f"{seq:08d}")
+            with _open_map(base + SEGMENT_SUFFIX) as mm:
+                if mm is None:
+                    continue
+                view = memoryview(mm)
+                try:
+                    for i in indices:
+                        if ops is not None and seg_ops[i] not in ops:
+                            continue
+                        pos = offsets[i]
+                        if pos + _RECORD.size > len(mm):
+                            break
+                        length, ts, op = _RECORD.unpack_from(mm, pos)
+                        body = pos + _RECORD.size
+                        if body + length > len(mm):
+                            _LOG.warning(f"Truncated record in segment {seq} at offset {pos}.")
+                            break
+                        yield ts, op, _decode(view[body:body + length])
+                finally:
+                    view.release()
+
+    def __iter__(self):
+        return self.scan()
+
+
+class _open_map:
+    def __init__(self, filename: str):
+        self._file = open(filename, "rb")
+        self._map = None
+
+    def __enter__(self) -> t.Optional[mmap.mmap]:
+        if os.fstat(self._file.fileno()).st_size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def __exit__(self, *exc):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+
+def _list_segments(path: str) -> t.List[int]:
+    seqs = []
+    for name in os.listdir(path):
+        stem, ext = os.path.splitext(name)
+        if ext == SEGMENT_SUFFIX and stem.isdigit():
+            seqs.append(int(stem))
+    return seqs
@@ -0,0 +1,211 @@
+"""
+Drive many simulated kxspy clients against a Kxs network ( or a local stand-in ).
+
+Example:
+    python -m kxspy.loadtest --clients 500 --rate 2 --duration 30
+    python -m kxspy.loadtest --url ws://127.0.0.1:8080/ --clients 100 --uvloop
+"""
+import os
+import sys
+import json
+import asyncio
+import argparse
+import logging
+import typing as t
+from collections import deque
+from time import perf_counter, process_time
+import aiohttp
+from .client import Client
+from .events import IdentifyEvent, ConfirmChatMessage, KillEvent, ChatMessage, VoiceData
+from .fakeserver import FakeKxsServer
+from .transport import TransportConfig
+from .utils import run
+
+_LOG = logging.getLogger("kxspy.loadtest")
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+        # ru_maxrss is in KiB on Linux, bytes on macOS
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def _percentile(ordered: t.List[float], p: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class _SimClient:
+    def __init__(self, index: int, url: str, session: aiohttp.ClientSession, game_id: str, transport: TransportConfig) -> None:
+        self.client = Client(ws_url=url, username=f"load_{index}", connect=False, session=session, transport=transport)
+        self.game_id = game_id
+        self.ready = asyncio.Event()
+        self.sent_at: t.Deque[float] = deque()
+        self.latencies: t.List[float] = []
+        self.received = 0
+
+        emitter = self.client.emitter
+        emitter.add_listener(IdentifyEvent, self._on_identify)
+        emitter.add_listener(ConfirmChatMessage, self._on_confirm)
+        for ev in (KillEvent, ChatMessage, VoiceData):
+            emitter.add_listener(ev, self._on_event)
+
+    async def _on_identify(self, event: IdentifyEvent):
+        await self.client.join_game(self.game_id)
+        self.ready.set()
+
+    async def _on_confirm(self, event: ConfirmChatMessage):
+        if self.sent_at:
+            self.latencies.append(perf_counter() - self.sent_at.popleft())
+
+    async def _on_event(self, event):
+        self.received += 1
+
+    async def drive(self, rate: float, duration: float, kill_every: int, voice_every: int, voice_samples: int):
+        interval = 1 / rate if rate > 0 else duration
+        end = perf_counter() + duration
+        sent = 0
+        while perf_counter() < end:
+            sent += 1
+            self.sent_at.append(perf_counter())
+            await self.client.send_message(f"load {sent}")
+            if kill_every and sent % kill_every == 0:
+                await self.client.report_kill(self.client.username, "dummy")
+            if voice_every and sent % voice_every == 0:
+                await self.client.ws.send({"op": 99, "d": [0] * voice_samples, "u": self.client.ws.uuid})
+            await asyncio.sleep(interval)
+        return sent
+
+
+async def loadtest(
+    clients: int = 100,
+    rate: float = 1.0,
+    duration: float = 10.0,
+    url: t.Optional[str] = None,
+    game_size: int = 10,
+    kill_every: int = 10,
+    voice_every: int = 0,
+    voice_samples: int = 960,
+    connect_timeout: float = 60.0,
+    transport: t.Optional[TransportConfig] = None,
+) -> dict:
+    """
+    Run a load test and return the report.
+
+    Parameters
+    ---------
+    clients: :class:`int`
+        Number of simulated clients.
+    rate: :class:`float`
+        Chat messages per second per client.
+    duration: :class:`float`
+        Seconds of sending once every client is ready.
+    url: :class:`str`
+        Websocket url, a local :class:`FakeKxsServer` is started when ``None``.
+    game_size: :class:`int`
+        Clients per game, chat/kills/voice are relayed inside a game.
+    kill_every: :class:`int`
+        Send a kill every N chat messages, ``0`` to disable.
+    voice_every: :class:`int`
+        Send a voice frame every N chat messages, ``0`` to disable.
+    voice_samples: :class:`int`
+        Samples per voice frame.
+    transport: :class:`TransportConfig`
+        Transport options of the clients, e.g. to compare compression settings.
+    """
+    transport = transport or TransportConfig()
+    server = None
+    if url is None:
+        server = FakeKxsServer()
+        await server.start()
+        url = server.ws_url
+
+    rss_before = _rss_bytes()
+    connector = aiohttp.TCPConnector(limit=0)
+    session = aiohttp.ClientSession(connector=connector)
+    sims = [_SimClient(i, url, session, f"game_{i // max(1, game_size)}", transport) for i in range(clients)]
+    try:
+        connect_start = perf_counter()
+        for sim in sims:
+            sim.client.ws.connect()
+        await asyncio.wait_for(asyncio.gather(*(s.ready.wait() for s in sims)), connect_timeout)
+        connect_time = perf_counter() - connect_start
+
+        cpu_start, wall_start = process_time(), perf_counter()
+        sent = await asyncio.gather(*(
+            s.drive(rate, duration, kill_every, voice_every, voice_samples) for s in sims
+        ))
+        # let in-flight confirmations arrive
+        await asyncio.sleep(min(2.0, duration / 5))
+        wall, cpu = perf_counter() - wall_start, process_time() - cpu_start
+        rss = _rss_bytes()
+    finally:
+        await asyncio.gather(*(s.client.ws.destroy(drain_timeout=1.0) for s in sims))
+        await session.close()
+        if server is not None:
+            await server.close()
+
+    latencies = sorted(lat for s in sims for lat in s.latencies)
+    total_sent = sum(sent)
+    return {
+        "clients": clients,
+        "connect_time_s": connect_time,
+        "sent": total_sent,
+        "confirmed": len(latencies),
+        "received_events": sum(s.received for s in sims),
+        "throughput_msg_s": len(latencies) / wall,
+        "latency_ms": {
+            "p50": _percentile(latencies, 50) * 1000,
+            "p95": _percentile(latencies, 95) * 1000,
+            "p99": _percentile(latencies, 99) * 1000,
+            "max": (latencies[-1] if latencies else 0.0) * 1000,
+        },
+        "cpu_percent": cpu / wall * 100,
+        "cpu_ms_per_client": cpu / clients * 1000,
+        "rss_bytes": rss,
+        "rss_bytes_per_client": max(0, rss - rss_before) / clients,
+        "compress": transport.compress,
+        "loop": type(asyncio.get_running_loop()).__module__,
+        # with the local stand-in, cpu and rss include the server
+        "local_server": server is not None,
+    }
+
+
+def main(argv: t.Optional[t.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m kxspy.loadtest", description="kxspy load test.")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=1.0, help="Chat messages per second per client.")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--url", default=None, help="Websocket url, a local stand-in server is used by default.")
+    parser.add_argument("--game-size", type=int, default=10)
+    parser.add_argument("--kill-every", type=int, default=10)
+    parser.add_argument("--voice-every", type=int, default=0)
+    parser.add_argument("--voice-samples", type=int, default=960)
+    parser.add_argument("--compress", type=int, default=0, help="permessage-deflate window bits, 0 disables.")
+    parser.add_argument("--uvloop", action="store_true", help="Run on uvloop when installed.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    report = run(loadtest(
+        clients=args.clients,
+        rate=args.rate,
+        duration=args.duration,
+        url=args.url,
+        game_size=args.game_size,
+        kill_every=args.kill_every,
+        voice_every=args.voice_every,
+        voice_samples=args.voice_samples,
+        transport=TransportConfig(compress=args.compress),
+    ), use_uvloop=args.uvloop)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,19 @@
 from inspect import signature
 from dataclasses import dataclass
 
+_FIELDS: dict = {}
+
 # https://stackoverflow.com/questions/55099243/python3-dataclass-with-kwargsasterisk
 class BaseObject:
     @classmethod
     def from_kwargs(cls, **kwargs):
-        # fetch the constructor's signature
-        cls_fields = {field for field in signature(cls).parameters}
+        # fetch the constructor's signature ( cached, signature() is slow )
+        cls_fields = _FIELDS.get(cls)
+        if cls_fields is None:
+            cls_fields = _FIELDS[cls] = frozenset(signature(cls).parameters)
+
+        if cls_fields.issuperset(kwargs):
+            return cls(**kwargs)
 
         # split the kwargs into native ones and new ones
         native_args, new_args = {}, {}
@@ -0,0 +1,276 @@
+import asyncio
+import logging
+import typing as t
+from collections import deque
+from time import monotonic
+from .events import ConfirmChatMessage, ErrorEvent, HelloEvent
+from .exceptions import ChatError
+
+_LOG = logging.getLogger("kxspy.outbox")
+
+
+class TokenBucket:
+    """
+    Simple token bucket.
+
+    Parameters
+    ---------
+    rate: :class:`float`
+        Tokens added per second.
+    burst: :class:`int`
+        Maximum number of tokens.
+    """
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = monotonic()
+
+    def _refill(self):
+        now = monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self) -> float:
+        """Seconds to wait before a token is available."""
+        self._refill()
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def take(self):
+        self._refill()
+        self._tokens -= 1
+
+    def drain(self):
+        """Empty the bucket, used to back off after a server error."""
+        self._refill()
+        self._tokens = min(self._tokens, 0.0)
+
+
+class ChatOutbox:
+    """
+    Rate limited queue in front of op 7 ( chat messages ).
+
+    Identical messages queued within ``dedupe_window`` seconds are coalesced and
+    share the same future. With ``join_short`` enabled, queued messages are joined
+    into a single frame while they fit in ``max_length``. Every frame sent is
+    correlated with the next :class:`ConfirmChatMessage` or op 7 :class:`ErrorEvent`.
+    Frames are only sent while connected and one at a time; a frame without an
+    answer after ``confirm_timeout`` seconds, or when the connection is replaced,
+    fails with :class:`ChatError`.
+
+    Parameters
+    ---------
+    ws: :class:`WS`
+        The websocket used to send frames.
+    rate: :class:`float`
+        Messages per second allowed on average.
+    burst: :class:`int`
+        Messages allowed back to back.
+    dedupe_window: :class:`float`
+        Window in seconds for coalescing identical messages, ``0`` to disable.
+    join_short: :class:`bool`
+        Join queued messages into one frame.
+    max_length: :class:`int`
+        Maximum length of a joined frame.
+    separator: :class:`str`
+        Separator used when joining messages.
+    confirm_timeout: :class:`float`
+        Seconds to wait for the confirmation of a frame.
+    """
+    def __init__(
+        self,
+        ws,
+        rate: float = 1.0,
+        burst: int = 3,
+        dedupe_window: float = 5.0,
+        join_short: bool = False,
+        max_length: int = 200,
+        separator: str = " | ",
+        confirm_timeout: float = 10.0,
+    ) -> None:
+        self.ws = ws
+        self.bucket = TokenBucket(rate, burst)
+        self.dedupe_window = dedupe_window
+        self.join_short = join_short
+        self.max_length = max_length
+        self.separator = separator
+        self.confirm_timeout = confirm_timeout
+
+        self._queue: t.Deque[t.Tuple[str, asyncio.Future]] = deque()
+        self._recent: t.Dict[str, t.Tuple[float, asyncio.Future]] = {}
+        self._inflight: t.Deque[t.List[asyncio.Future]] = deque()
+        self._wakeup: t.Optional[asyncio.Event] = None
+        self._task: t.Optional[asyncio.Task] = None
+
+        self.sent = 0
+        self.coalesced = 0
+        self.joined = 0
+        self.errors = 0
+
+        ws.emitter.add_listener(ConfirmChatMessage, self._on_confirm)
+        ws.emitter.add_listener(ErrorEvent, self._on_error)
+        ws.emitter.add_listener(HelloEvent, self._on_hello)
+
+    def send(self, text: str) -> asyncio.Future:
+        """
+        Queue a message.
+
+        Returns
+        -------
+        :class:`asyncio.Future`
+            Resolved with ``True`` once the server confirms the frame carrying
+            this message, or failed with :class:`ChatError`.
+        """
+        loop = asyncio.get_running_loop()
+        now = monotonic()
+
+        if self.dedupe_window > 0:
+            recent = self._recent.get(text)
+            if recent is not None and now - recent[0] < self.dedupe_window:
+                self.coalesced += 1
+                return recent[1]
+
+        fut = loop.create_future()
+        # callers may not await the confirmation, don't warn about lost errors
+        fut.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._queue.append((text, fut))
+        if self.dedupe_window > 0:
+            # re-inserted so the dict stays ordered by time for _prune
+            self._recent.pop(text, None)
+            self._recent[text] = (now, fut)
+            self._prune(now)
+
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._run())
+        self._wakeup.set()
+        return fut
+
+    def _prune(self, now: float):
+        # dict keeps insertion order, so expired entries sit at the front
+        while self._recent:
+            text, (stamp, _) = next(iter(self._recent.items()))
+            if now - stamp < self.dedupe_window:
+                break
+            del self._recent[text]
+
+    def _next_frame(self) -> t.Tuple[str, t.List[asyncio.Future]]:
+        text, fut = self._queue.popleft()
+        futures = [fut]
+        if self.join_short:
+            while self._queue:
+                nxt = self._queue[0][0]
+                if len(text) + len(self.separator) + len(nxt) > self.max_length:
+                    break
+                text = text + self.separator + nxt
+                futures.append(self._queue.popleft()[1])
+                self.joined += 1
+        return text, futures
+
+    async def _run(self):
+        while True:
+            # one frame in flight, so a lost frame can't shift the confirmations
+            if not self._queue or self._inflight:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            # frames queued by WS while disconnected would shift the confirmations
+            if not self.ws.is_connected:
+                await asyncio.sleep(0.5)
+                continue
+
+            delay = self.bucket.delay()
+            if delay:
+                await asyncio.sleep(delay)
+                continue
+
+            self.bucket.take()
+            text, futures = self._next_frame()
+            self._inflight.append(futures)
+            try:
+                sent = await self.ws.send({"op": 7, "d": {"text": text}}, queue=False)
+            except Exception as e:
+                _LOG.error(f"Failed to send chat message: {e}")
+                self._fail(futures, e)
+                continue
+            if not sent:
+                self._fail(futures, ChatError("Chat message was not sent, websocket disconnected."))
+                continue
+            self.sent += 1
+            asyncio.get_running_loop().call_later(self.confirm_timeout, self._expire, futures)
+
+    def _settled(self):
+        if not self._inflight and self._wakeup is not None:
+            self._wakeup.set()
+
+    def _fail(self, futures: t.List[asyncio.Future], error: Exception):
+        try:
+            self._inflight.remove(futures)
+        except ValueError:
+            pass
+        for fut in futures:
+            if not fut.done():
+                fut.set_exception(error)
+        self._settled()
+
+    def _expire(self, futures: t.List[asyncio.Future]):
+        if not any(entry is futures for entry in self._inflight):
+            return
+        # older frames are unanswered as well
+        while self._inflight:
+            expired = self._inflight.popleft()
+            self._fail(expired, ChatError("No confirmation for the chat message."))
+            if expired is futures:
+                break
+        _LOG.warning("Chat message confirmation timed out.")
+
+    def _resolve(self, result: t.Any = None, error: t.Optional[Exception] = None):
+        if not self._inflight:
+            return
+        for fut in self._inflight.popleft():
+            if fut.done():
+                continue
+            if error is not None:
+                fut.set_exception(error)
+            else:
+                fut.set_result(result)
+        self._settled()
+
+    async def _on_hello(self, event: HelloEvent):
+        # a new connection, frames sent on the previous one won't be confirmed
+        while self._inflight:
+            self._fail(self._inflight.popleft(), ChatError("Connection lost before the chat message was confirmed."))
+
+    async def _on_confirm(self, event: ConfirmChatMessage):
+        self._resolve(result=event.ok)
+
+    async def _on_error(self, event: ErrorEvent):
+        if event.op != 7:
+            return
+        self.errors += 1
+        self.bucket.drain()
+        _LOG.warning(f"Chat message rejected: {event.error}")
+        self._resolve(error=ChatError(event.error))
+
+    @property
+    def pending(self) -> int:
+        """Number of messages waiting to be sent."""
+        return len(self._queue)
+
+    async def close(self):
+        """Stop the outbox and cancel pending messages."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        for _, fut in self._queue:
+            fut.cancel()
+        for futures in self._inflight:
+            for fut in futures:
+                fut.cancel()
+        self._queue.clear()
+        self._inflight.clear()
+        self._recent.clear()
@@ -0,0 +1,105 @@
+import logging
+import typing as t
+from .events import (
+    HeartBeatEvent,
+    GameStart,
+    ExchangeOnlineEvent,
+    ExchangeOfflineEvent,
+    PlayerJoined,
+    PlayerLeft,
+)
+
+_LOG = logging.getLogger("kxspy.presence")
+
+
+def _player_name(player: t.Any) -> t.Optional[str]:
+    if isinstance(player, str):
+        return player
+    if isinstance(player, dict):
+        return player.get("username") or player.get("name")
+    return getattr(player, "username", None)
+
+
+class Presence:
+    """
+    Keeps track of online players from the websocket events.
+
+    The full player list of each :class:`HeartBeatEvent` is the authoritative
+    snapshot; :class:`GameStart`, :class:`ExchangeOnlineEvent` and
+    :class:`ExchangeOfflineEvent` update it between heartbeats. Changes are
+    emitted as :class:`PlayerJoined` and :class:`PlayerLeft`.
+
+    Parameters
+    ---------
+    emitter: :class:`Emitter`
+        The emitter to listen on and to emit presence events to.
+    """
+    def __init__(self, emitter) -> None:
+        self.emitter = emitter
+        self._online: t.Set[str] = set()
+
+        emitter.add_listener(HeartBeatEvent, self._on_heartbeat)
+        emitter.add_listener(GameStart, self._on_game_start)
+        emitter.add_listener(ExchangeOnlineEvent, self._on_online)
+        emitter.add_listener(ExchangeOfflineEvent, self._on_offline)
+
+    def _join(self, name: str):
+        if name and name not in self._online:
+            self._online.add(name)
+            self.emitter.emit("PlayerJoined", PlayerJoined(username=name))
+
+    def _leave(self, name: str):
+        if name in self._online:
+            self._online.discard(name)
+            self.emitter.emit("PlayerLeft", PlayerLeft(username=name))
+
+    def update(self, players: t.Iterable[t.Any]):
+        """
+        Replace the snapshot with ``players`` and emit the differences.
+
+        Parameters
+        ---------
+        players: :class:`list`
+            Usernames ( or player dicts with a ``username`` key ).
+        """
+        snapshot = {name for name in map(_player_name, players) if name}
+        left = self._online - snapshot
+        joined = snapshot - self._online
+        for name in left:
+            self._leave(name)
+        for name in joined:
+            self._join(name)
+        if joined or left:
+            _LOG.debug(f"Presence update: +{len(joined)} -{len(left)}")
+
+    async def _on_heartbeat(self, event: HeartBeatEvent):
+        if event.players is not None:
+            self.update(event.players)
+
+    async def _on_game_start(self, event: GameStart):
+        for player in event.players or ():
+            self._join(_player_name(player))
+
+    async def _on_online(self, event: ExchangeOnlineEvent):
+        self._join(event.username)
+
+    async def _on_offline(self, event: ExchangeOfflineEvent):
+        self._leave(event.username)
+
+    def is_online(self, name: str) -> bool:
+        """Return whether ``name`` is currently online."""
+        return name in self._online
+
+    @property
+    def online_count(self) -> int:
+        """Number of players currently online."""
+        return len(self._online)
+
+    @property
+    def online(self) -> t.FrozenSet[str]:
+        """Snapshot of the online usernames."""
+        return frozenset(self._online)
+
+    def clear(self):
+        """Forget every tracked player without emitting events."""
+        self._online.clear()
@@ -1,6 +1,7 @@
 import aiohttp
 import logging
 from time import time
+from .exceptions import RestError
 
 _LOG = logging.getLogger("kxspy.rest")
 
@@ -14,11 +15,48 @@ class RestApi:
         Rest url of the kxs network REST API.
     adminKey: :class:`str`
         Only for admin routs .
+    raise_for_status: :class:`bool`
+        Raise :class:`RestError` when a response is not a 2xx, by default it is only logged.
     """
-    def __init__(self, kxs_network_rest_url: str = "https://network.kxs.rip", adminKey: str = None, session: aiohttp.ClientSession = None) -> None:
+    def __init__(
+        self,
+        kxs_network_rest_url: str = "https://network.kxs.rip",
+        adminKey: str = None,
+        session: aiohttp.ClientSession = None,
+        raise_for_status: bool = False,
+    ) -> None:
         self.rest_uri = kxs_network_rest_url
         self.admin_key = adminKey
-        self.session = session or aiohttp.ClientSession()
+        self.raise_for_status = raise_for_status
+        self._session = session
+        self._owns_session = session is None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """The http session, created on first use."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+            self._owns_session = True
+        return self._session
+
+    @session.setter
+    def session(self, session: aiohttp.ClientSession):
+        self._session = session
+        self._owns_session = False
+
+    async def close(self):
+        """Close the http session if it was created by this client."""
+        if not self._owns_session:
+            return
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
 
     async def request(self, method: str, rout: str, data: dict = {}) -> dict or str:
         """
@@ -37,18 +75,25 @@ class RestApi:
         -------
         :class:`dict` or :class:`str`
             The response from the request.
+
+        Raises
+        ------
+        :class:`RestError`
+            If ``raise_for_status`` is set and the response is not a 2xx.
         """
         rout = rout
         async with self.session.request(method, self.rest_uri + rout,json=data) as _response:
             _LOG.debug(f"{method} {self.rest_uri + rout}")
             if _response.content_type == "text/plain":
-                return await _response.text()
-
-            response = await _response.json()
+                response = await _response.text()
+            else:
+                response = await _response.json()
 
             _LOG.debug(response)
 
-            if _response.status != 200:
+            if not 200 <= _response.status < 300:
+                if self.raise_for_status:
+                    raise RestError(_response.status, response)
                 _LOG.error(f"Request failed: {response}")
             return response
 
@@ -0,0 +1,202 @@
+import os
+import asyncio
+import logging
+import multiprocessing
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+from . import events as _events
+from .emitter import Emitter
+from .events import Event
+
+_LOG = logging.getLogger("kxspy.shard")
+
+EVENT_NAMES = [
+    name for name, obj in vars(_events).items()
+    if isinstance(obj, type) and issubclass(obj, Event) and obj is not Event
+]
+
+
+async def _shard_main(shard_id: int, identities: t.List[t.Tuple[int, dict]], conn, batch_size: int, flush_interval: float):
+    from .ws import WS
+
+    loop = asyncio.get_running_loop()
+    buffer: t.List[t.Tuple[int, Event]] = []
+    flush_now = asyncio.Event()
+    connections: t.Dict[int, WS] = {}
+
+    def forwarder(index: int):
+        async def forward(event: Event):
+            buffer.append((index, event))
+            if len(buffer) >= batch_size:
+                flush_now.set()
+        return forward
+
+    for index, identity in identities:
+        ws = WS(**identity)
+        for name in EVENT_NAMES:
+            ws.emitter.add_listener(name, forwarder(index))
+        connections[index] = ws
+
+    def flush():
+        if buffer:
+            batch = buffer[:]
+            buffer.clear()
+            try:
+                conn.send(batch)
+            except Exception:
+                _LOG.exception(f"Shard {shard_id} failed to forward {len(batch)} events")
+
+    async def flusher():
+        while True:
+            try:
+                await asyncio.wait_for(flush_now.wait(), flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            flush_now.clear()
+            flush()
+
+    flush_task = loop.create_task(flusher())
+    _LOG.info(f"Shard {shard_id} started with {len(connections)} connections")
+    try:
+        while True:
+            command = await loop.run_in_executor(None, conn.recv)
+            if command[0] == "send":
+                _, index, payload = command
+                await connections[index].send(payload)
+            elif command[0] == "stop":
+                break
+    except (EOFError, OSError):
+        _LOG.warning(f"Shard {shard_id} lost its parent pipe")
+    finally:
+        for ws in connections.values():
+            await ws.destroy()
+        flush_task.cancel()
+        await asyncio.gather(flush_task, return_exceptions=True)
+        # events buffered since the last flush, including those of the drained handlers
+        flush()
+        conn.close()
+
+
+def _run_shard(shard_id: int, identities: t.List[t.Tuple[int, dict]], conn, batch_size: int, flush_interval: float):
+    try:
+        asyncio.run(_shard_main(shard_id, identities, conn, batch_size, flush_interval))
+    except KeyboardInterrupt:
+        pass
+
+
+class ShardedClient:
+    """
+    Spread many websocket connections over worker processes.
+
+    Every worker owns a slice of ``identities`` and runs its own :class:`WS`
+    connections; decoded events are forwarded in batches to the parent through a
+    pipe and re-emitted on :attr:`emitter`, so :func:`listener` hooks work as with
+    :class:`Client`. Each forwarded event gets an ``identity`` attribute holding the
+    index of the identity that received it.
+
+    Parameters
+    ---------
+    identities: :class:`list`
+        One dict of :class:`WS` keyword arguments per connection.
+    shards: :class:`int`
+        Number of worker processes, defaults to the cpu count.
+    batch_size: :class:`int`
+        Events buffered by a worker before forwarding.
+    flush_interval: :class:`float`
+        Maximum seconds a worker buffers events.
+    """
+    def __init__(
+        self,
+        identities: t.List[dict],
+        shards: t.Optional[int] = None,
+        batch_size: int = 64,
+        flush_interval: float = 0.01,
+    ) -> None:
+        self.identities = identities
+        self.shards = max(1, min(shards or os.cpu_count() or 1, len(identities) or 1))
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.emitter = Emitter()
+
+        self._processes: t.List[multiprocessing.Process] = []
+        self._pipes: t.List[t.Any] = []
+        self._pump_tasks: t.List[asyncio.Task] = []
+        self._executor: t.Optional[ThreadPoolExecutor] = None
+
+    def shard_for(self, index: int) -> int:
+        """Return the shard owning the identity at ``index``."""
+        return index % self.shards
+
+    def add_event_hooks(self, obj: t.Any, weak: bool = False):
+        """
+        Scans the provided class ``obj`` for functions decorated with :func:`listener`.
+        """
+        self.emitter.add_event_hooks(obj, weak=weak)
+
+    def remove_event_hooks(self, obj: t.Any):
+        """
+        Removes all previously registered listeners for an object.
+        """
+        self.emitter.remove_event_hooks(obj)
+
+    async def start(self):
+        """Spawn the worker processes and start forwarding events."""
+        loop = asyncio.get_running_loop()
+        slices: t.List[t.List[t.Tuple[int, dict]]] = [[] for _ in range(self.shards)]
+        for index, identity in enumerate(self.identities):
+            slices[self.shard_for(index)].append((index, identity))
+        # one blocking reader thread per pipe
+        self._executor = ThreadPoolExecutor(self.shards, thread_name_prefix="kxspy-shard-pump")
+
+        for shard_id, identities in enumerate(slices):
+            parent_conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_run_shard,
+                args=(shard_id, identities, child_conn, self.batch_size, self.flush_interval),
+                name=f"kxspy-shard-{shard_id}",
+                daemon=True,
+            )
+            process.start()
+            child_conn.close()
+            self._processes.append(process)
+            self._pipes.append(parent_conn)
+            self._pump_tasks.append(loop.create_task(self._pump(shard_id, parent_conn)))
+
+    async def _pump(self, shard_id: int, conn):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                batch = await loop.run_in_executor(self._executor, conn.recv)
+            except (EOFError, OSError):
+                _LOG.warning(f"Shard {shard_id} pipe closed")
+                return
+            for index, event in batch:
+                event.identity = index
+                self.emitter.emit(type(event).__name__, event)
+
+    async def send(self, index: int, payload: dict):
+        """Send ``payload`` on the connection of the identity at ``index``."""
+        self._pipes[self.shard_for(index)].send(("send", index, payload))
+
+    async def close(self, timeout: float = 5.0):
+        """Stop every worker."""
+        for conn in self._pipes:
+            try:
+                conn.send(("stop",))
+            except (BrokenPipeError, OSError):
+                pass
+        loop = asyncio.get_running_loop()
+        for process in self._processes:
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                process.terminate()
+        for task in self._pump_tasks:
+            task.cancel()
+        for conn in self._pipes:
+            conn.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self._processes.clear()
+        self._pipes.clear()
+        self._pump_tasks.clear()
@@ -0,0 +1,286 @@
+import os
+import json
+import asyncio
+import logging
+import sqlite3
+import typing as t
+from abc import ABC, abstractmethod
+from dataclasses import asdict, is_dataclass
+from time import time
+from . import events as _events
+from .events import Event
+
+_LOG = logging.getLogger("kxspy.state")
+
+STATE_VERSION = 1
+
+
+class StateStore(ABC):
+    """
+    Where a :class:`SessionState` keeps its snapshot. Subclass it and implement
+    :meth:`load`, :meth:`save` and :meth:`clear` to use another backend.
+    """
+    @abstractmethod
+    def load(self) -> t.Optional[dict]:
+        """The last saved snapshot, ``None`` if there is none."""
+
+    @abstractmethod
+    def save(self, state: dict):
+        """Replace the snapshot with ``state``."""
+
+    @abstractmethod
+    def clear(self):
+        """Delete the snapshot."""
+
+
+class FileStateStore(StateStore):
+    """
+    Keeps the snapshot in a JSON file, replaced atomically on every save.
+
+    Parameters
+    ---------
+    path: :class:`str`
+        File to use.
+    """
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def load(self) -> t.Optional[dict]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            _LOG.warning(f"Ignoring unreadable state file {self.path}: {e}")
+            return None
+
+    def save(self, state: dict):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class SqliteStateStore(StateStore):
+    """
+    Keeps snapshots in a sqlite database, one row per ``key`` so several clients
+    can share a database.
+
+    Parameters
+    ---------
+    path: :class:`str`
+        Database file.
+    key: :class:`str`
+        Row of this client, e.g. its username.
+    """
+    def __init__(self, path: str, key: str = "default") -> None:
+        self.path = path
+        self.key = key
+        db = self._connect()
+        try:
+            # the context manager only commits, the connection is closed here
+            with db:
+                db.execute("CREATE TABLE IF NOT EXISTS kxspy_state (key TEXT PRIMARY KEY, data TEXT NOT NULL, updated REAL NOT NULL)")
+        finally:
+            db.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        # a connection per call, saves may run in a worker thread
+        return sqlite3.connect(self.path)
+
+    def load(self) -> t.Optional[dict]:
+        db = self._connect()
+        try:
+            row = db.execute("SELECT data FROM kxspy_state WHERE key = ?", (self.key,)).fetchone()
+        finally:
+            db.close()
+        if row is None:
+            return None
+        try:
+            return json.loads(row[0])
+        except ValueError as e:
+            _LOG.warning(f"Ignoring unreadable state {self.key} in {self.path}: {e}")
+            return None
+
+    def save(self, state: dict):
+        db = self._connect()
+        try:
+            with db:
+                db.execute(
+                    "INSERT OR REPLACE INTO kxspy_state (key, data, updated) VALUES (?, ?, ?)",
+                    (self.key, json.dumps(state, separators=(",", ":")), time()),
+                )
+        finally:
+            db.close()
+
+    def clear(self):
+        db = self._connect()
+        try:
+            with db:
+                db.execute("DELETE FROM kxspy_state WHERE key = ?", (self.key,))
+        finally:
+            db.close()
+
+
+def open_store(path: str, key: str = "default") -> StateStore:
+    """A :class:`SqliteStateStore` for ``.db``/``.sqlite``/``.sqlite3`` paths, a :class:`FileStateStore` otherwise."""
+    if os.path.splitext(path)[1].lower() in (".db", ".sqlite", ".sqlite3"):
+        return SqliteStateStore(path, key)
+    return FileStateStore(path)
+
+
+def _dump_event(event: t.Any) -> t.Optional[dict]:
+    if not is_dataclass(event):
+        return None
+    return {"type": type(event).__name__, "data": asdict(event)}
+
+
+def _load_event(entry: dict) -> t.Optional[Event]:
+    cls = getattr(_events, entry.get("type", ""), None)
+    if not (isinstance(cls, type) and issubclass(cls, Event)):
+        return None
+    return cls.from_kwargs(**entry["data"])
+
+
+class SessionState:
+    """
+    Snapshots the session of a :class:`Client` so a restarted process resumes
+    where it stopped instead of starting from scratch.
+
+    The snapshot holds the identity ( username, exchange key ), the ``uuid`` of the
+    last :class:`IdentifyEvent`, the current game, the payloads still queued for
+    sending and the sticky events ( see :meth:`Emitter.last` ). On :meth:`restore`
+    the game is joined again by queueing its join, which is sent right after the
+    identify, so the client is back in its game within one round trip.
+
+    Parameters
+    ---------
+    client: :class:`Client`
+        The client to snapshot.
+    store: :class:`StateStore`
+        Where the snapshot is kept.
+    interval: :class:`float`
+        Seconds between two periodic snapshots, ``None`` to only save on close.
+    restore_identity: :class:`bool`
+        Restore the username and exchange key of the snapshot, :class:`Client`
+        keeps the ones passed to it explicitly.
+    """
+    def __init__(self, client, store: StateStore, interval: t.Optional[float] = 30.0, restore_identity: bool = True) -> None:
+        self.client = client
+        self.store = store
+        self.interval = interval
+        self.restore_identity = restore_identity
+        self.restored = False
+        self._task: t.Optional[asyncio.Task] = None
+
+    def snapshot(self) -> dict:
+        """The current session as a JSON serializable dict."""
+        client, ws = self.client, self.client.ws
+        games = client.games
+        sticky = {}
+        for name, event in ws.emitter._last.items():
+            entry = _dump_event(event)
+            if entry is not None:
+                sticky[name] = entry
+        return {
+            "version": STATE_VERSION,
+            "saved_at": time(),
+            "username": client.username,
+            "exchange_key": ws.exchange_key,
+            "uuid": ws.uuid,
+            "ws_url": ws.ws_url,
+            "game_id": games.current.gameId if games.current is not None else None,
+            # stale voice frames are useless after a restart
+            "queue": [p for p in ws._message_queue if p.get("op") != 99],
+            "sticky": sticky,
+        }
+
+    def save(self):
+        """Write a snapshot to the store."""
+        self.store.save(self.snapshot())
+
+    def restore(self, keep_username: bool = False, keep_exchange_key: bool = False) -> bool:
+        """
+        Apply the stored snapshot to the client, call it before the client connects.
+
+        Parameters
+        ---------
+        keep_username: :class:`bool`
+            Keep the username of the client, e.g. when it was set by the caller.
+        keep_exchange_key: :class:`bool`
+            Keep the exchange key of the client.
+
+        Returns
+        -------
+        :class:`bool`
+            ``False`` if there was no usable snapshot.
+        """
+        state = self.store.load()
+        if not state or state.get("version") != STATE_VERSION:
+            return False
+        client, ws = self.client, self.client.ws
+
+        if self.restore_identity:
+            if not keep_username and state.get("username"):
+                client.username = ws.username = state["username"]
+            if not keep_exchange_key and state.get("exchange_key") is not None:
+                ws.exchange_key = state["exchange_key"]
+                if ws.exchange is not None:
+                    ws.exchange.exchange_key = ws.exchange_key
+        ws._uuid = state.get("uuid")
+
+        queue = list(state.get("queue") or ())
+        game_id = state.get("game_id")
+        if game_id is not None:
+            client.games.join(game_id)
+            join = {"op": 3, "d": {"gameId": game_id, "user": client.username}}
+            if join not in queue:
+                queue.insert(0, join)
+        ws._message_queue[:0] = queue
+
+        for name, entry in (state.get("sticky") or {}).items():
+            if name not in ws.emitter.sticky:
+                continue
+            try:
+                event = _load_event(entry)
+            except (TypeError, KeyError, ValueError) as e:
+                _LOG.debug(f"Could not restore {name}: {e}")
+                continue
+            if event is not None:
+                ws.emitter._last.setdefault(name, event)
+
+        self.restored = True
+        _LOG.info(f"Restored session of {client.username}: game {game_id}, {len(queue)} queued payloads")
+        return True
+
+    def start(self):
+        """Start the periodic snapshots on the running loop."""
+        if self.interval is None or (self._task is not None and not self._task.done()):
+            return
+        self._task = asyncio.get_running_loop().create_task(self._periodic())
+
+    async def _periodic(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.store.save, self.snapshot())
+            except Exception:
+                _LOG.exception("Failed to save the session state")
+
+    async def close(self):
+        """Stop the periodic snapshots and save a last one."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await asyncio.to_thread(self.store.save, self.snapshot())
+        except Exception:
+            _LOG.exception("Failed to save the session state")
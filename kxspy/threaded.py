@@ -0,0 +1,201 @@
+import queue
+import asyncio
+import logging
+import threading
+import typing as t
+from concurrent.futures import Future, ThreadPoolExecutor
+from .events import Event
+
+_LOG = logging.getLogger("kxspy.threaded")
+
+
+class ThreadedClient:
+    """
+    Runs a :class:`Client` on a background event loop thread for synchronous code.
+
+    Send methods are thread safe, return immediately and give a
+    :class:`concurrent.futures.Future`. Events are delivered to :attr:`events`
+    ( a thread safe queue ) for the types passed to :meth:`forward`, or to plain
+    callbacks run on a thread pool with :meth:`add_callback`.
+
+    Parameters
+    ---------
+    connect: :class:`bool`
+        Connect as soon as the loop is started.
+    callback_workers: :class:`int`
+        Threads used to run callbacks.
+    **kwargs:
+        Passed to :class:`Client`.
+
+    Example:
+        with ThreadedClient(username="tool") as kxs:
+            kxs.forward(KillEvent)
+            kxs.send_message("hello").result(timeout=5)
+            event = kxs.events.get()
+    """
+    def __init__(self, connect: bool = True, callback_workers: int = 4, **kwargs) -> None:
+        self._kwargs = kwargs
+        self._connect = connect
+        self._callback_workers = callback_workers
+        self.events: "queue.SimpleQueue[Event]" = queue.SimpleQueue()
+        self.client = None
+
+        self._loop: t.Optional[asyncio.AbstractEventLoop] = None
+        self._thread: t.Optional[threading.Thread] = None
+        self._executor: t.Optional[ThreadPoolExecutor] = None
+        self._ready = threading.Event()
+        self._start_error: t.Optional[BaseException] = None
+        self._connect_task: t.Optional[asyncio.Task] = None
+
+    def start(self, timeout: t.Optional[float] = 30.0) -> "ThreadedClient":
+        """Start the loop thread and create the client."""
+        if self._thread is not None:
+            return self
+        self._executor = ThreadPoolExecutor(self._callback_workers, thread_name_prefix="kxspy-callback")
+        self._thread = threading.Thread(target=self._run, name="kxspy-loop", daemon=True)
+        self._thread.start()
+        if not self._ready.wait(timeout):
+            raise TimeoutError("kxspy loop thread did not start in time.")
+        if self._start_error is not None:
+            raise self._start_error
+        return self
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        try:
+            loop.run_until_complete(self._setup())
+        except BaseException as e:
+            self._start_error = e
+            self._ready.set()
+            loop.close()
+            return
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+
+    async def _setup(self):
+        from .client import Client
+
+        self.client = Client(connect=False, **self._kwargs)
+        if self._connect:
+            # not awaited, start() returns without waiting for the connection
+            self._connect_task = asyncio.get_running_loop().create_task(self.client.connect())
+
+    async def _close(self):
+        if self._connect_task is not None and not self._connect_task.done():
+            # still connecting, also cancels the connection attempt it waits on
+            self._connect_task.cancel()
+            await asyncio.gather(self._connect_task, return_exceptions=True)
+        # close() saves the session state and stops the background tasks
+        await self.client.close()
+        await self.client.ws.destroy()
+
+    def stop(self, timeout: t.Optional[float] = 10.0):
+        """Close the connection and stop the loop thread."""
+        if self._thread is None:
+            return
+        try:
+            self.submit(self._close()).result(timeout)
+        except Exception as e:
+            _LOG.warning(f"Error while closing the client: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._executor.shutdown(wait=False)
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def submit(self, coro: t.Coroutine) -> Future:
+        """
+        Run a coroutine on the client loop from any thread.
+
+        Returns
+        -------
+        :class:`concurrent.futures.Future`
+        """
+        if self._loop is None:
+            coro.close()
+            raise RuntimeError("ThreadedClient is not started.")
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def _add_listener(self, event: t.Union[str, t.Type[Event]], func: t.Callable):
+        if self._loop is None:
+            raise RuntimeError("ThreadedClient is not started.")
+        self._loop.call_soon_threadsafe(self.client.emitter.add_listener, event, func)
+
+    def forward(self, *events: t.Union[str, t.Type[Event]]):
+        """Put every event of these types into :attr:`events`."""
+        for ev in events:
+            self._add_listener(ev, self._enqueue)
+
+    async def _enqueue(self, event: Event):
+        self.events.put(event)
+
+    def add_callback(self, event: t.Union[str, t.Type[Event]], func: t.Callable[[Event], t.Any]):
+        """
+        Call the synchronous ``func`` on the callback thread pool for every ``event``.
+        """
+        async def run_callback(data: Event):
+            self._executor.submit(self._safe_callback, func, data)
+
+        self._add_listener(event, run_callback)
+
+    @staticmethod
+    def _safe_callback(func: t.Callable, data: Event):
+        try:
+            func(data)
+        except Exception:
+            _LOG.exception(f"Error in callback {func!r}")
+
+    def join_game(self, gameId) -> Future:
+        """Join a game by its ID."""
+        return self.submit(self.client.join_game(gameId))
+
+    def leave_game(self) -> Future:
+        """Leave the current game."""
+        return self.submit(self.client.leave_game())
+
+    def report_kill(self, killer: str, killed: str) -> Future:
+        """Report a kill in the game"""
+        return self.submit(self.client.report_kill(killer, killed))
+
+    def check_version(self) -> Future:
+        """Check for the latest version of Kxs"""
+        return self.submit(self.client.check_version())
+
+    def send_message(self, text: str) -> Future:
+        """
+        Send a message to the in-game chat
+
+        With ``chat_outbox`` enabled the future is resolved on :class:`ConfirmChatMessage`,
+        see :meth:`Client.send_message`.
+        """
+        return self.submit(self._send_message(text))
+
+    async def _send_message(self, text: str):
+        result = await self.client.send_message(text)
+        if isinstance(result, asyncio.Future):
+            # the outbox future belongs to the loop thread, resolve ours from it
+            return await result
+        return result
+
+    def update_voicechat(self, isVoiceChat: bool) -> Future:
+        """Update the voice chat status"""
+        return self.submit(self.client.update_voicechat(isVoiceChat))
+
+    def send_voicedata(self, audio_data, user_id: t.Optional[str] = None) -> Future:
+        """Send voice data"""
+        return self.submit(self.client.send_voicedata(audio_data, user_id))
+
+    def last(self, event: t.Union[str, t.Type[Event]], default: t.Any = None) -> t.Any:
+        """The last received sticky event, see :meth:`Client.last`."""
+        return self.client.last(event, default)
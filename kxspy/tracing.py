@@ -0,0 +1,240 @@
+import os
+import json
+import random
+import logging
+import typing as t
+from contextvars import ContextVar
+from itertools import count
+from time import perf_counter_ns, time_ns
+
+_LOG = logging.getLogger("kxspy.tracing")
+
+# frame being handled by the current task, handler tasks inherit it
+_CURRENT_FRAME: "ContextVar[t.Optional[FrameTrace]]" = ContextVar("kxspy_frame", default=None)
+
+
+def current_frame() -> t.Optional["FrameTrace"]:
+    """The :class:`FrameTrace` of the frame being handled, ``None`` if not sampled."""
+    return _CURRENT_FRAME.get()
+
+
+def activate_frame(frame: t.Optional["FrameTrace"]):
+    """Make ``frame`` the frame of the current task, returns a token for :func:`deactivate_frame`."""
+    return _CURRENT_FRAME.set(frame)
+
+
+def deactivate_frame(token):
+    _CURRENT_FRAME.reset(token)
+
+
+class FrameTrace:
+    """
+    Spans recorded for one websocket frame, from the socket read to the end of
+    the last handler.
+
+    Spans are ``(name, start, end, attributes)`` tuples with :func:`time.perf_counter_ns`
+    timestamps, use :meth:`to_wall` to convert them. The recorded names are
+    ``receive`` ( frame read until its handling starts ), ``decode`` ( JSON ),
+    ``construct`` ( event object ), ``queue_wait`` ( handler scheduled until it
+    runs ) and ``handler`` ( handler run, attribute ``handler`` ).
+    """
+    __slots__ = ("id", "op", "events", "start", "end", "spans", "_tracer", "_pending")
+
+    def __init__(self, tracer: "Tracer", frame_id: int, start: int) -> None:
+        self.id = frame_id
+        self.op: t.Optional[int] = None
+        self.events: t.List[str] = []
+        self.start = start
+        self.end: t.Optional[int] = None
+        self.spans: t.List[t.Tuple[str, int, int, t.Dict[str, t.Any]]] = []
+        self._tracer = tracer
+        self._pending = 1
+
+    def span(self, name: str, start: int, end: t.Optional[int] = None, **attributes):
+        """Record a span, ``end`` defaults to now."""
+        self.spans.append((name, start, perf_counter_ns() if end is None else end, attributes))
+
+    def hold(self) -> bool:
+        """
+        Keep the frame open until :meth:`release`, used for each handler.
+        Returns ``False`` if the frame was already exported.
+        """
+        if self.end is not None:
+            return False
+        self._pending += 1
+        return True
+
+    def release(self):
+        self._pending -= 1
+        if self._pending == 0:
+            self.end = perf_counter_ns()
+            self._tracer.export(self)
+
+    def to_wall(self, timestamp: int) -> int:
+        """Convert a span timestamp to nanoseconds since the epoch."""
+        return timestamp + self._tracer.epoch_offset
+
+    @property
+    def duration(self) -> float:
+        """Seconds from the socket read to the end of the last handler."""
+        return ((self.end or perf_counter_ns()) - self.start) / 1e9
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "op": self.op,
+            "events": self.events,
+            "duration": self.duration,
+            "spans": [
+                {"name": name, "start": start - self.start, "duration": end - start, **attributes}
+                for name, start, end, attributes in self.spans
+            ],
+        }
+
+
+class Tracer:
+    """
+    Opt-in per-frame tracing of :class:`WS` and :class:`Emitter`.
+
+    A sampled frame gets a :class:`FrameTrace` that follows it through decoding,
+    event construction and every handler; once the last handler has finished it
+    is passed to each sink. Sinks are callables taking the :class:`FrameTrace`,
+    e.g. :class:`ChromeTraceSink`, :class:`OpenTelemetrySink` or a plain function.
+
+    Parameters
+    ---------
+    sinks: :class:`list`
+        Callables receiving the finished frames.
+    sample_rate: :class:`float`
+        Fraction of frames traced, ``1.0`` traces every frame.
+
+    Example:
+        tracer = Tracer(ChromeTraceSink("kxspy.trace.json"), sample_rate=0.1)
+        client = kxspy.Client(tracer=tracer)
+    """
+    def __init__(self, *sinks: t.Callable[[FrameTrace], t.Any], sample_rate: float = 1.0) -> None:
+        self.sinks = list(sinks)
+        self.sample_rate = sample_rate
+        self.epoch_offset = time_ns() - perf_counter_ns()
+        self.sampled = 0
+        self._ids = count(1)
+
+    def start_frame(self, start: t.Optional[int] = None) -> t.Optional[FrameTrace]:
+        """Start tracing a frame, ``None`` when it is not sampled."""
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return None
+        self.sampled += 1
+        return FrameTrace(self, next(self._ids), perf_counter_ns() if start is None else start)
+
+    def activate(self, frame: t.Optional[FrameTrace]):
+        """Make ``frame`` the frame of the current task, returns a token for :meth:`deactivate`."""
+        return activate_frame(frame)
+
+    @staticmethod
+    def deactivate(token):
+        deactivate_frame(token)
+
+    def export(self, frame: FrameTrace):
+        for sink in self.sinks:
+            try:
+                sink(frame)
+            except Exception:
+                _LOG.exception(f"Tracing sink {sink!r} failed")
+
+    def close(self):
+        """Close the sinks that can be closed, e.g. to write a Chrome trace file."""
+        for sink in self.sinks:
+            close = getattr(sink, "close", None)
+            if close is not None:
+                close()
+
+
+class ChromeTraceSink:
+    """
+    Collects frames in the Chrome trace event format, written to ``path`` by
+    :meth:`close`. Open the file in ``chrome://tracing`` or Perfetto; every frame
+    is a row with its spans nested under it.
+
+    Parameters
+    ---------
+    path: :class:`str`
+        File to write.
+    max_frames: :class:`int`
+        Frames kept, later ones are dropped.
+    """
+    def __init__(self, path: str, max_frames: int = 100_000) -> None:
+        self.path = path
+        self.max_frames = max_frames
+        self.frames = 0
+        self.dropped = 0
+        self._events: t.List[dict] = []
+        self._pid = os.getpid()
+
+    def __call__(self, frame: FrameTrace):
+        if self.frames >= self.max_frames:
+            self.dropped += 1
+            return
+        self.frames += 1
+        name = f"op {frame.op}" + (f" {','.join(frame.events)}" if frame.events else "")
+        self._events.append(self._event(name, frame, frame.start, frame.end, {"op": frame.op, "events": frame.events}))
+        for span_name, start, end, attributes in frame.spans:
+            self._events.append(self._event(span_name, frame, start, end, attributes))
+
+    def _event(self, name: str, frame: FrameTrace, start: int, end: int, args: dict) -> dict:
+        return {
+            "name": name,
+            "ph": "X",
+            "ts": frame.to_wall(start) / 1000,
+            "dur": (end - start) / 1000,
+            "pid": self._pid,
+            "tid": frame.id,
+            "args": args,
+        }
+
+    def flush(self):
+        """Write the collected frames to ``path``."""
+        with open(self.path, "w") as f:
+            json.dump({"traceEvents": self._events, "displayTimeUnit": "ms"}, f, default=str)
+
+    def close(self):
+        self.flush()
+        _LOG.info(f"Wrote {self.frames} traced frames to {self.path}")
+
+
+class OpenTelemetrySink:
+    """
+    Exports every frame as an OpenTelemetry span with a child span per step.
+    Requires ``opentelemetry-api``, spans go to the configured tracer provider.
+
+    Parameters
+    ---------
+    name: :class:`str`
+        Instrumentation name of the tracer.
+
+    Raises
+    ------
+    :class:`ImportError`
+        If OpenTelemetry is not installed.
+    """
+    def __init__(self, name: str = "kxspy") -> None:
+        from opentelemetry import trace
+
+        self._trace = trace
+        self._tracer = trace.get_tracer(name)
+
+    def __call__(self, frame: FrameTrace):
+        root = self._tracer.start_span(
+            "kxspy.frame",
+            start_time=frame.to_wall(frame.start),
+            attributes={"kxspy.op": frame.op if frame.op is not None else -1, "kxspy.events": frame.events},
+        )
+        context = self._trace.set_span_in_context(root)
+        for name, start, end, attributes in frame.spans:
+            span = self._tracer.start_span(
+                f"kxspy.{name}",
+                context=context,
+                start_time=frame.to_wall(start),
+                attributes={f"kxspy.{k}": str(v) for k, v in attributes.items()},
+            )
+            span.end(end_time=frame.to_wall(end))
+        root.end(end_time=frame.to_wall(frame.end))
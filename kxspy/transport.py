@@ -0,0 +1,82 @@
+import socket
+import logging
+import typing as t
+from dataclasses import dataclass
+
+_LOG = logging.getLogger("kxspy.transport")
+
+
+@dataclass(frozen=True)
+class TransportConfig:
+    """
+    Websocket transport options used by :class:`WS`.
+
+    Parameters
+    ---------
+    compress: :class:`int`
+        permessage-deflate window bits ( ``9`` - ``15`` ) requested from the server,
+        ``0`` disables compression. Compression costs CPU on every frame and voice
+        data compresses poorly, keep it off for voice bots.
+    max_msg_size: :class:`int`
+        Largest message accepted, ``0`` for no limit.
+    autoping: :class:`bool`
+        Answer server pings automatically.
+    heartbeat: :class:`float`
+        Seconds between websocket pings, ``None`` to disable.
+    receive_timeout: :class:`float`
+        Seconds to wait for a frame before timing out, ``None`` to wait forever.
+    tcp_nodelay: :class:`bool`
+        Disable Nagle's algorithm so small frames are sent immediately.
+    send_buffer_size: :class:`int`
+        ``SO_SNDBUF`` of the socket, ``None`` for the system default.
+    receive_buffer_size: :class:`int`
+        ``SO_RCVBUF`` of the socket, ``None`` for the system default.
+    read_bufsize: :class:`int`
+        Read buffer of the http session, only used when :class:`WS` creates the session.
+    """
+    compress: int = 0
+    max_msg_size: int = 4 * 1024 * 1024
+    autoping: bool = True
+    heartbeat: t.Optional[float] = 60.0
+    receive_timeout: t.Optional[float] = None
+    tcp_nodelay: bool = True
+    send_buffer_size: t.Optional[int] = None
+    receive_buffer_size: t.Optional[int] = None
+    read_bufsize: int = 2 ** 16
+
+    def ws_connect_kwargs(self) -> dict:
+        """Keyword arguments for :meth:`aiohttp.ClientSession.ws_connect`."""
+        kwargs = {
+            "compress": self.compress,
+            "max_msg_size": self.max_msg_size,
+            "autoping": self.autoping,
+            "heartbeat": self.heartbeat,
+        }
+        if self.receive_timeout is not None:
+            kwargs["receive_timeout"] = self.receive_timeout
+        return kwargs
+
+    def session_kwargs(self) -> dict:
+        """Keyword arguments for :class:`aiohttp.ClientSession`."""
+        return {"read_bufsize": self.read_bufsize}
+
+    def apply_socket_options(self, sock: t.Optional[socket.socket]):
+        """Set the socket options on a connected socket."""
+        if sock is None:
+            return
+        try:
+            if sock.family in (socket.AF_INET, socket.AF_INET6):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, int(self.tcp_nodelay))
+            if self.send_buffer_size:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer_size)
+            if self.receive_buffer_size:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.receive_buffer_size)
+        except OSError as e:
+            _LOG.warning(f"Failed to set socket options: {e}")
+
+
+CHAT = TransportConfig()
+"""Defaults for chat and event traffic."""
+
+VOICE = TransportConfig(compress=0, max_msg_size=16 * 1024 * 1024, send_buffer_size=256 * 1024)
+"""Uncompressed with larger buffers, for voice traffic."""
@@ -1,5 +1,8 @@
+import sys
 import random
+import asyncio
 import logging
+import typing as t
 
 _LOG = logging.getLogger("kxspy.utils")
 
@@ -7,3 +10,49 @@ def get_random_username():
     return "kxspy_" + ''.join(random.choice("0123456789abcdef") for _ in range(10))
 
 
+def uvloop_available() -> bool:
+    try:
+        import uvloop  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def run(main: t.Coroutine, *, use_uvloop: bool = True, debug: t.Optional[bool] = None) -> t.Any:
+    """
+    Run ``main`` in a new event loop, using uvloop when it is installed.
+
+    Kxspy objects bind to the running loop when they connect, so they can be
+    created inside ``main`` under any loop implementation.
+
+    Parameters
+    ---------
+    main: :class:`Coroutine`
+        The coroutine to run.
+    use_uvloop: :class:`bool`
+        Use uvloop if available ( ``pip install kxspy[uvloop]`` ).
+    debug: :class:`bool`
+        Enable asyncio debug mode.
+
+    Example:
+        async def main():
+            client = kxspy.Client()
+            await client.connect()
+            ...
+
+        kxspy.run(main())
+    """
+    loop_factory = None
+    if use_uvloop and sys.platform != "win32" and uvloop_available():
+        import uvloop
+        loop_factory = uvloop.new_event_loop
+        _LOG.debug("Running with uvloop")
+
+    if hasattr(asyncio, "Runner"):
+        with asyncio.Runner(debug=debug, loop_factory=loop_factory) as runner:
+            return runner.run(main)
+
+    if loop_factory is not None:
+        import uvloop
+        uvloop.install()
+    return asyncio.run(main, debug=debug)
@@ -0,0 +1,182 @@
+import math
+import logging
+import typing as t
+from dataclasses import dataclass
+
+if t.TYPE_CHECKING:
+    import numpy as np
+
+_LOG = logging.getLogger("kxspy.vad")
+
+SPEECH = "speech"
+HANGOVER = "hangover"
+COMFORT_NOISE = "comfort_noise"
+SILENCE = "silence"
+
+# RMS of a full scale int16 signal, 0 dBFS
+_FULL_SCALE = 32768.0
+
+
+@dataclass
+class VADStats:
+    """
+    Counters of a :class:`VoiceActivityDetector`.
+
+    Parameters
+    ---------
+    frames: :class:`int`
+        Frames processed.
+    frames_sent: :class:`int`
+        Frames let through ( speech and hangover ).
+    frames_suppressed: :class:`int`
+        Silent frames dropped.
+    comfort_noise: :class:`int`
+        Comfort noise markers sent in place of silent frames.
+    bytes_saved: :class:`int`
+        PCM bytes ( 2 per sample ) of the suppressed frames.
+    """
+    frames: int = 0
+    frames_sent: int = 0
+    frames_suppressed: int = 0
+    comfort_noise: int = 0
+    bytes_saved: int = 0
+
+    @property
+    def suppressed_ratio(self) -> float:
+        return self.frames_suppressed / self.frames if self.frames else 0.0
+
+
+class VoiceActivityDetector:
+    """
+    Energy based voice activity detection for int16 voice frames.
+
+    The RMS level of every frame is compared to an estimate of the background
+    noise: a frame is speech when it is ``margin_db`` above the noise floor and
+    above ``threshold_db``. After speech, ``hangover`` more frames are sent so
+    word endings are not clipped. The first silent frame of a run is replaced by
+    a comfort noise marker ( an empty frame ) so receivers know the stream paused,
+    the following ones are dropped.
+
+    Parameters
+    ---------
+    threshold_db: :class:`float`
+        Absolute level in dBFS under which a frame is always silent.
+    margin_db: :class:`float`
+        Level above the noise floor needed for speech.
+    hangover: :class:`int`
+        Frames still sent after the last speech frame.
+    noise_alpha: :class:`float`
+        Weight of a silent frame in the noise floor estimate, the floor drops
+        immediately to quieter frames.
+    floor_rise_db: :class:`float`
+        Maximum rise of the noise floor per speech frame, so a lasting louder
+        background is eventually treated as noise ( ``0.05`` is 2.5 dB/s with 20 ms frames ).
+    comfort_noise: :class:`bool`
+        Send a marker at the start of each silence, otherwise silence is only dropped.
+    """
+    def __init__(
+        self,
+        threshold_db: float = -50.0,
+        margin_db: float = 10.0,
+        hangover: int = 8,
+        noise_alpha: float = 0.05,
+        floor_rise_db: float = 0.05,
+        comfort_noise: bool = True,
+    ) -> None:
+        self.threshold_db = threshold_db
+        self.margin_db = margin_db
+        self.hangover = hangover
+        self.noise_alpha = noise_alpha
+        self.floor_rise_db = floor_rise_db
+        self.comfort_noise = comfort_noise
+
+        self.noise_floor_db: t.Optional[float] = None
+        self.stats = VADStats()
+        self._hangover_left = 0
+        self._silent = False
+
+    @staticmethod
+    def levels(frames: "np.ndarray") -> "np.ndarray":
+        """
+        RMS level in dBFS of every row of a 2D int16 array, or of a single 1D frame.
+        Empty frames have no level, ``nan``.
+        """
+        import numpy as np
+
+        x = np.asarray(frames, dtype=np.float32)
+        if x.shape[-1] == 0:
+            return np.full(x.shape[:-1], np.nan, dtype=np.float32)
+        rms = np.sqrt(np.mean(np.square(x), axis=-1)) / _FULL_SCALE
+        return 20 * np.log10(np.maximum(rms, 1e-10))
+
+    def _decide(self, level: float) -> str:
+        if not math.isfinite(level):
+            # nothing to measure ( empty frame ), a nan would stick in the noise floor
+            return SILENCE
+        floor = self.noise_floor_db
+        if floor is None:
+            # start from the absolute threshold so a stream starting with speech is detected
+            floor = self.threshold_db
+
+        if level >= self.threshold_db and level >= floor + self.margin_db:
+            # slow rise, speech barely moves the floor but a steady louder noise catches up
+            self.noise_floor_db = floor + min(self.floor_rise_db, level - floor)
+            self._hangover_left = self.hangover
+            self._silent = False
+            return SPEECH
+
+        if level < floor:
+            self.noise_floor_db = level
+        else:
+            self.noise_floor_db = floor + self.noise_alpha * (level - floor)
+
+        if self._hangover_left > 0:
+            self._hangover_left -= 1
+            return HANGOVER
+        if not self._silent:
+            self._silent = True
+            return COMFORT_NOISE if self.comfort_noise else SILENCE
+        return SILENCE
+
+    def _count(self, decision: str, samples: int):
+        stats = self.stats
+        stats.frames += 1
+        if decision in (SPEECH, HANGOVER):
+            stats.frames_sent += 1
+            return
+        stats.frames_suppressed += 1
+        stats.bytes_saved += samples * 2
+        if decision == COMFORT_NOISE:
+            stats.comfort_noise += 1
+
+    def process(self, frame: "np.ndarray") -> str:
+        """
+        Classify one frame.
+
+        Returns
+        -------
+        :class:`str`
+            ``"speech"`` or ``"hangover"`` when the frame should be sent,
+            ``"comfort_noise"`` when a marker should be sent instead,
+            ``"silence"`` when nothing should be sent.
+        """
+        decision = self._decide(float(self.levels(frame)))
+        self._count(decision, len(frame))
+        return decision
+
+    def process_many(self, frames: "np.ndarray") -> t.List[str]:
+        """
+        Classify a 2D array of frames ( one frame per row ), the levels are
+        computed in one vectorized pass.
+        """
+        samples = frames.shape[-1]
+        decisions = [self._decide(level) for level in self.levels(frames).tolist()]
+        for decision in decisions:
+            self._count(decision, samples)
+        return decisions
+
+    def reset(self):
+        """Forget the noise floor and the hangover, e.g. when a new stream starts."""
+        self.noise_floor_db = None
+        self._hangover_left = 0
+        self._silent = False
@@ -3,7 +3,11 @@ import logging
 import aiohttp
 import kxspy
 from .emitter import Emitter
-from time import perf_counter
+from .exchange import ExchangePipeline
+from .transport import TransportConfig
+from .failover import EndpointPool
+from .tracing import Tracer, current_frame
+from time import perf_counter, perf_counter_ns
 from .utils import get_random_username
 from .events import *
 
@@ -42,7 +46,10 @@ class WS:
         connect: bool = True,
         isMobile: bool = False,
         isSecure: bool = True,
-        session: aiohttp.ClientSession | None = None
+        session: aiohttp.ClientSession | None = None,
+        ordered_exchange: bool = False,
+        transport: TransportConfig | None = None,
+        tracer: Tracer | None = None
     ):
         self.ws_url = ws_url
         self.username = username or get_random_username()
@@ -50,9 +57,14 @@ class WS:
         self.exchange_key = exchange_key
         self.isMobile = isMobile
         self.isSecure = isSecure
-
-        self._loop = asyncio.get_event_loop()
-        self._session = session or aiohttp.ClientSession()
+        self.transport = transport or TransportConfig()
+        self.tracer = tracer
+
+        # bound to the running loop by connect()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._session = session
+        # a session given by the caller may be shared, it is never closed here
+        self._owns_session = session is None
         self._ws: aiohttp.ClientWebSocketResponse | None = None
         self._message_queue: list[dict] = []
         self._listen_task: asyncio.Task | None = None
@@ -64,21 +76,40 @@ class WS:
         self._uuid = None
 
         self.emitter = Emitter()
+        self.exchange: ExchangePipeline | None = None
+        # set by EndpointPool.attach to pick another node when a connection fails
+        self.failover: EndpointPool | None = None
+        if ordered_exchange:
+            self.exchange = ExchangePipeline(self.emitter, exchange_key)
         self.version = f"kxspy/{kxspy.__version__}"
 
         if connect:
-            self.connect()
+            try:
+                self.connect()
+            except RuntimeError:
+                _LOG.debug("No running event loop, waiting for connect() to be called.")
 
     def connect(self) -> asyncio.Task:
+        """
+        Schedule the connection on the running event loop.
+
+        Raises
+        ------
+        :class:`RuntimeError`
+            If called without a running event loop.
+        """
         if self._destroyed:
             raise IOError("Cannot connect: transport destroyed.")
 
+        self._loop = asyncio.get_running_loop()
+
         if self._listen_task and not self._listen_task.done():
             self._listen_task.cancel()
 
         return self._loop.create_task(self._connect())
 
     async def _connect(self):
+        self._loop = asyncio.get_running_loop()
         await self.close()
 
         attempt = 0
@@ -86,13 +117,22 @@ class WS:
             attempt += 1
             try:
                 _LOG.info(f"Connecting to WebSocket: {self.ws_url}")
-                self._ws = await self._session.ws_connect(self.ws_url, heartbeat=60)
+                if self._session is None or self._session.closed:
+                    self._session = aiohttp.ClientSession(**self.transport.session_kwargs())
+                    self._owns_session = True
+                self._ws = await self._session.ws_connect(self.ws_url, **self.transport.ws_connect_kwargs())
+                self.transport.apply_socket_options(self._ws.get_extra_info("socket"))
                 self.is_connect = True
                 _LOG.info("WebSocket connection established.")
+                if self.exchange is not None:
+                    self.exchange.reconnected()
                 self._listen_task = self._loop.create_task(self._listen())
                 break
             except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
                 delay = min(10 * attempt, 60)
+                if self.failover is not None:
+                    self.ws_url = self.failover.next_ws_url(self.ws_url)
+                    delay = min(attempt, 10)
                 _LOG.error(
                     f"Connection failed ({type(exc).__name__}: {exc}), retrying in {delay}s..."
                 )
@@ -112,7 +152,7 @@ class WS:
         if not self.is_connected:
             raise ConnectionError("WebSocket is not connected.")
 
-        fut = asyncio.get_event_loop().create_future()
+        fut = asyncio.get_running_loop().create_future()
         start = perf_counter()
 
         async def on_version_update(_event):
@@ -133,6 +173,10 @@ class WS:
             _LOG.error("Timeout : VersionUpdate did not arrive in time ( mesure_latency ).")
             return None
 
+    async def reconnect(self):
+        """Close the connection and connect again, returns once connected."""
+        await self.connect()
+
     async def close(self, code=aiohttp.WSCloseCode.OK):
         if self._listen_task:
             self._listen_task.cancel()
@@ -148,8 +192,9 @@ class WS:
                 self._ws = None
                 self.is_connect = False
 
-    async def destroy(self):
-        self._closing = True
+    async def destroy(self, drain_timeout: float = 5.0):
+        # set first so the cancelled listener does not reconnect
+        self._destroyed = True
 
         tasks = []
         for task in [self._listen_task, self._heartbeat_task]:
@@ -160,15 +205,18 @@ class WS:
         if self._ws and not self._ws.closed:
             await self._ws.close()
 
-        if self._session and not self._session.closed:
+        if self._owns_session and self._session and not self._session.closed:
             await self._session.close()
 
+        if self.exchange is not None:
+            await self.exchange.close()
+        await self.emitter.drain(timeout=drain_timeout)
+
         if tasks:
             await asyncio.gather(*tasks, return_exceptions=True)
 
         self._ws = None
         self.is_connect = False
-        self._destroyed = True
         _LOG.info("Kxspy WS destroyed cleanly.")
 
 
@@ -177,8 +225,12 @@ class WS:
         try:
             async for msg in self._ws:
                 if msg.type == aiohttp.WSMsgType.TEXT:
-                    _LOG.debug(f"Received message: {msg.data}")
-                    self._loop.create_task(self._handle_message_safe(msg))
+                    _LOG.debug("Received message: %s", msg.data)
+                    frame = self.tracer.start_frame() if self.tracer is not None else None
+                    if frame is not None:
+                        self._loop.create_task(self._handle_message_traced(msg, frame))
+                    else:
+                        self._loop.create_task(self._handle_message_safe(msg))
                 elif msg.type in (
                     aiohttp.WSMsgType.CLOSE,
                     aiohttp.WSMsgType.CLOSING,
@@ -190,7 +242,8 @@ class WS:
                     _LOG.error(f"WebSocket error: {msg.data}")
                     break
         except asyncio.CancelledError:
-            pass
+            # cancelled by close()/destroy(), they handle the reconnection
+            return
         except Exception as e:
             _LOG.exception(f"Unexpected error while listening websocket message: {e}")
 
@@ -206,86 +259,163 @@ class WS:
         except Exception:
             _LOG.exception("Error while handling websocket message")
 
+    async def _handle_message_traced(self, msg: aiohttp.WSMessage, frame):
+        frame.span("receive", frame.start)
+        token = self.tracer.activate(frame)
+        try:
+            start = perf_counter_ns()
+            payload = msg.json()
+            frame.span("decode", start)
+            if isinstance(payload, dict):
+                frame.op = payload.get("op")
+            await self._handle_message(payload)
+        except Exception:
+            _LOG.exception("Error while handling websocket message")
+        finally:
+            self.tracer.deactivate(token)
+            frame.release()
+
     async def _handle_message(self, payload: dict):
         op = payload.get("op")
         d = payload.get("d", {})
 
-        if d.get("error", None) is not None:
+        # op 99 carries the voice samples as a list
+        if isinstance(d, dict) and d.get("error", None) is not None:
             event_name = OP_EVENT_NAMES.get(op, f"UnknownEvent(op={op})")
-            self.emitter.emit(
-                "ErrorEvent",
-                ErrorEvent(event=event_name, error=d.get("error", "Unknown error"),op=op)
-            )
+            self._emit("ErrorEvent", ErrorEvent, {"event": event_name, "error": d.get("error", "Unknown error"), "op": op})
             return
         if op == 1:  # Heartbeat
-            self.emitter.emit("HeartBeatEvent", HeartBeatEvent.from_kwargs(**d))
+            self._emit("HeartBeatEvent", HeartBeatEvent, d)
         elif op == 2:  # Identify
             self._uuid = d.get("uuid")
-            self.emitter.emit("IdentifyEvent", IdentifyEvent.from_kwargs(**d))
+            self._emit("IdentifyEvent", IdentifyEvent, d)
         elif op == 3:  # Game start
             if d.get("system", None) is not None:
-                self.emitter.emit("GameStart", GameStart.from_kwargs(**payload["d"]))
+                self._emit("GameStart", GameStart, d)
             else:
-                self.emitter.emit("ConfirmGameStart", ConfirmGameStart.from_kwargs(**payload["d"]))
+                self._emit("ConfirmGameStart", ConfirmGameStart, d)
         elif op == 4:  # Game end
             if d.get("left", None) is not None:
-                self.emitter.emit("GameEnd", GameEnd.from_kwargs(**payload["d"]))
+                self._emit("GameEnd", GameEnd, d)
             else:
-                self.emitter.emit("ConfirmGameEnd", ConfirmGameEnd.from_kwargs(**payload["d"]))
+                self._emit("ConfirmGameEnd", ConfirmGameEnd, d)
         elif op == 5: # KILL EVENT
-            self.emitter.emit("KillEvent", KillEvent.from_kwargs(**d))
+            self._emit("KillEvent", KillEvent, d)
         elif op == 6: # VERSION UPDATE
-            self.emitter.emit("VersionUpdate", VersionUpdate.from_kwargs(**d))
+            self._emit("VersionUpdate", VersionUpdate, d)
         elif op == 7: # CHAT MESSAGE
             if d.get("user", None) is not None:
-                self.emitter.emit("ChatMessage", ChatMessage.from_kwargs(**payload["d"]))
+                self._emit("ChatMessage", ChatMessage, d)
             else:
-                self.emitter.emit("ConfirmChatMessage", ConfirmChatMessage.from_kwargs(**payload["d"]))
+                self._emit("ConfirmChatMessage", ConfirmChatMessage, d)
         elif op == 10:  # Hello (heartbeat interval)
             interval = d.get("heartbeat_interval", 3000)
             await self.send({"op": 2,"d":{"username":self.username,"isVoiceChat":self.enable_voice_chat,"v":self.version,"isMobile":self.isMobile,"isSecure":self.isSecure,"exchangeKey":self.exchange_key}})
+            await self._flush_queue()
             await self._start_heartbeat(interval)
-            self.emitter.emit("HelloEvent", HelloEvent.from_kwargs(**d))
+            self._emit("HelloEvent", HelloEvent, d)
         elif op == 12: # EXCHANGE KEY JOIN
-            self.emitter.emit("ExchangejoinEvent", ExchangejoinEvent.from_kwargs(**d))
+            self._emit_exchange(op, "ExchangejoinEvent", ExchangejoinEvent, d)
         elif op == 13: # EXCHANGE KEY ONLINE
-            self.emitter.emit("ExchangeOnlineEvent", ExchangeOnlineEvent.from_kwargs(**d))
+            self._emit_exchange(op, "ExchangeOnlineEvent", ExchangeOnlineEvent, d)
         elif op == 14: # EXCHANGE KEY OFFLINE
-            self.emitter.emit("ExchangeOfflineEvent", ExchangeOfflineEvent.from_kwargs(**d))
+            self._emit_exchange(op, "ExchangeOfflineEvent", ExchangeOfflineEvent, d)
         elif op == 15: # GAME ALIVE EXCHANGE KEY
-            self.emitter.emit("ExchangeGameAliveEvent", ExchangeGameAliveEvent.from_kwargs(**d))
+            self._emit_exchange(op, "ExchangeGameAliveEvent", ExchangeGameAliveEvent, d)
         elif op == 16: # GAME END EXCHANGE KEY
-            d["data"]["stuff"] = Stuff.from_kwargs(**d["data"]["stuff"])
-            self.emitter.emit("ExchangeGameEnd", ExchangeGameEnd.from_kwargs(**d["data"]))
+            self._emit_exchange(op, "ExchangeGameEnd", ExchangeGameEnd, d)
         elif op == 87: # BROADCAST MESSAGE
-            self.emitter.emit("BroadCasteEvent", BroadCasteEvent.from_kwargs(**d))
+            self._emit("BroadCasteEvent", BroadCasteEvent, d)
             _LOG.info("Received BroadcastEvent (op 87).")
         elif op == 98: # VOICE CHAT UPDATE
             if d.get("user", None) is not None:
-                self.emitter.emit("VoiceChatUpdate", VoiceChatUpdate.from_kwargs(**payload["d"]))
+                self._emit("VoiceChatUpdate", VoiceChatUpdate, d)
             else:
-                self.emitter.emit("ConfirmVoiceChatUpdate", ConfirmVoiceChatUpdate.from_kwargs(**payload["d"]))
+                self._emit("ConfirmVoiceChatUpdate", ConfirmVoiceChatUpdate, d)
         elif op == 99: # VOICE DATA
-            self.emitter.emit("VoiceData", VoiceData(d=d, u=payload.get("u")))
+            self._emit("VoiceData", VoiceData, {"d": d, "u": payload.get("u")})
         else:
             _LOG.warning(f"Unknown opcode: {op} — payload: {payload}")
 
-    async def send(self, payload: dict):
+    def _emit(self, name: str, cls: type, d: dict):
+        # events nobody listens to are never built
+        if not self.emitter.wants(name):
+            return
+        frame = current_frame()
+        if frame is None:
+            self.emitter.emit(name, cls.from_kwargs(**d))
+        else:
+            start = perf_counter_ns()
+            event = cls.from_kwargs(**d)
+            frame.span("construct", start, event=name)
+            self.emitter.emit(name, event)
+
+    def _emit_exchange(self, op: int, name: str, cls: type, d: dict):
+        if not self.emitter.wants(name):
+            if op == 12 and self.exchange is not None:
+                # the lanes are keyed by the joined game, even when nobody listens to the join
+                self.exchange.game_id = d.get("gameId")
+            return
+        frame = current_frame()
+        start = perf_counter_ns() if frame is not None else 0
+        if op == 16:
+            data = dict(d["data"])
+            data["stuff"] = Stuff.from_kwargs(**data["stuff"])
+            event = cls.from_kwargs(**data)
+        else:
+            event = cls.from_kwargs(**d)
+        if frame is not None:
+            frame.span("construct", start, event=name)
+        if self.exchange is not None:
+            self.exchange.submit(op, d, name, event)
+        else:
+            self.emitter.emit(name, event)
+
+    async def send(self, payload: dict, queue: bool = True) -> bool:
+        """
+        Send a payload, queued until reconnected when the websocket is down.
+
+        Parameters
+        ---------
+        payload: :class:`dict`
+            The frame to send.
+        queue: :class:`bool`
+            Queue the payload when it cannot be sent now, otherwise it is dropped.
+
+        Returns
+        -------
+        :class:`bool`
+            ``True`` if the payload was written to the websocket, ``False`` if it
+            was queued or dropped.
+        """
         if not self.is_connect or not self._ws:
+            if not queue:
+                return False
             if len(self._message_queue) >= MESSAGE_QUEUE_MAX_SIZE:
                 _LOG.warning("Message queue full, discarding payload.")
-                return
+                return False
             _LOG.debug("Queueing payload until reconnected.")
             self._message_queue.append(payload)
-            return
+            return False
 
         try:
             await self._ws.send_json(payload)
+            return True
         except ConnectionResetError:
-            _LOG.warning("Connection reset during send, requeueing payload.")
-            self._message_queue.append(payload)
+            if queue:
+                _LOG.warning("Connection reset during send, requeueing payload.")
+                self._message_queue.append(payload)
             await self._connect()
+            return False
+
 
+    async def _flush_queue(self):
+        # payloads queued while disconnected are sent once identified
+        queued, self._message_queue = self._message_queue, []
+        if queued:
+            _LOG.debug(f"Sending {len(queued)} queued payloads.")
+        for payload in queued:
+            await self.send(payload)
 
     async def _start_heartbeat(self, interval: int):
         if self._heartbeat_task and not self._heartbeat_task.done():
@@ -37,6 +37,10 @@ setup(
     keywords='kxsclient, surviv, kxspy, kxs, kxsnetwork',
     packages=["kxspy"],
     install_requires=["aiohttp","numpy"],
+    extras_require={
+        "uvloop": ["uvloop; sys_platform != 'win32'"],
+        "tracing": ["opentelemetry-api"],
+    },
     project_urls={
         'Bug Reports': 'https://github.com/lavecat/Kxspy/issues',
         'Source': 'https://github.com/lavecat/Kxspy',
@@ -0,0 +1,125 @@
+import gc
+import sys
+import asyncio
+import importlib
+import tracemalloc
+import kxspy
+from kxspy.emitter import Emitter
+from kxspy.events import KillEvent
+
+COG_SOURCE = '''
+import kxspy
+from kxspy.events import KillEvent, ChatMessage
+
+
+class Cog:
+    def __init__(self):
+        self.kills = 0
+
+    @kxspy.listener(KillEvent)
+    async def on_kill(self, event):
+        self.kills += 1
+
+    @kxspy.listener(ChatMessage)
+    async def on_chat(self, event):
+        pass
+'''
+
+RELOADS = 1000
+# the interpreter grows some internal caches once during the first few hundred
+# reloads, memory is compared between the warmup and the end
+WARMUP = 500
+MEMORY_SLACK = 256 * 1024
+
+
+class Handlers:
+    def __init__(self):
+        self.kills = []
+
+    @kxspy.listener(KillEvent)
+    async def on_kill(self, event):
+        self.kills.append(event)
+
+
+def _kill() -> KillEvent:
+    return KillEvent(killer="a", killed="b", timestamp=0)
+
+
+def test_event_hooks_keep_their_owner_alive():
+    emitter = Emitter()
+    emitter.add_event_hooks(Handlers())
+    gc.collect()
+    assert emitter.listener_count(KillEvent) == 1
+
+    async def main():
+        await emitter.emit_wait(KillEvent, _kill())
+
+    asyncio.run(main())
+    listener = next(iter(emitter.listeners["KillEvent"].values()))
+    assert len(listener.func.__self__.kills) == 1
+
+
+def test_remove_event_hooks():
+    emitter = Emitter()
+    handlers = Handlers()
+    emitter.add_event_hooks(handlers)
+    emitter.add_event_hooks(handlers)
+    assert emitter.listener_count() == 1
+    emitter.remove_event_hooks(handlers)
+    assert emitter.listener_count() == 0
+
+
+def _reload_cogs(emitter: Emitter, module, cog, count: int, weak: bool):
+    for _ in range(count):
+        if cog is not None and not weak:
+            # what a discord.py cog_unload does
+            emitter.remove_event_hooks(cog)
+        module = importlib.reload(module)
+        cog = module.Cog()
+        emitter.add_event_hooks(cog, weak=weak)
+    return module, cog
+
+
+def _check_reloads(tmp_path, monkeypatch, weak: bool):
+    (tmp_path / "kxspy_test_cog.py").write_text(COG_SOURCE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    module = importlib.import_module("kxspy_test_cog")
+    emitter = Emitter()
+    try:
+        tracemalloc.start()
+        module, cog = _reload_cogs(emitter, module, None, WARMUP, weak)
+        gc.collect()
+        baseline = tracemalloc.get_traced_memory()[0]
+
+        module, cog = _reload_cogs(emitter, module, cog, RELOADS - WARMUP, weak)
+        gc.collect()
+        grown = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+        sys.modules.pop("kxspy_test_cog", None)
+
+    assert emitter.listener_count() == 2
+    assert len(emitter._owners) == 1
+    assert grown < MEMORY_SLACK, f"memory grew by {grown} bytes over {RELOADS - WARMUP} reloads"
+
+    async def main():
+        await emitter.emit_wait(KillEvent, _kill())
+
+    asyncio.run(main())
+    assert cog.kills == 1
+
+
+def test_cog_reload_with_remove_stays_flat(tmp_path, monkeypatch):
+    _check_reloads(tmp_path, monkeypatch, weak=False)
+
+
+def test_cog_reload_with_weak_hooks_stays_flat(tmp_path, monkeypatch):
+    _check_reloads(tmp_path, monkeypatch, weak=True)
+
+
+def test_weak_hooks_are_pruned_with_their_owner():
+    emitter = Emitter()
+    emitter.add_event_hooks(Handlers(), weak=True)
+    gc.collect()
+    assert emitter.listener_count() == 0
+    assert not emitter._owners
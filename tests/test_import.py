@@ -0,0 +1,44 @@
+import os
+import sys
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# loaded on first use only, see _LAZY_ATTRS in kxspy/__init__.py
+HEAVY_MODULES = ("aiohttp", "numpy", "asyncio")
+# cumulative import time of kxspy, measured at ~40 ms, with room for slow machines
+IMPORT_BUDGET_US = 500_000
+
+
+def _importtime(code: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if cum.isdigit():
+            cumulative[name] = int(cum)
+    return cumulative
+
+
+def test_import_does_not_load_heavy_modules():
+    modules = _importtime("import kxspy")
+    assert "kxspy" in modules
+    for name in HEAVY_MODULES:
+        assert name not in modules, f"import kxspy loaded {name}"
+
+
+def test_import_time_budget():
+    modules = _importtime("import kxspy")
+    assert modules["kxspy"] < IMPORT_BUDGET_US, f"import kxspy took {modules['kxspy']} us"
+
+
+def test_star_import_exports_lazy_names():
+    namespace = {}
+    exec("from kxspy import *", namespace)
+    for name in ("Client", "RestApi", "ThreadedClient", "run", "listener", "KillEvent"):
+        assert name in namespace